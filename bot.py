@@ -1,9 +1,20 @@
+import asyncio
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter
+from uuid import uuid4
+
 import discord
+import httplib2
 from discord.ext import commands
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+log = logging.getLogger(__name__)
 
 # --- 環境変数の読み込み ---
 load_dotenv()
@@ -11,106 +22,344 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 SPREADSHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
 
+# シート名は大文字小文字まで一致させて指定する（サーバー側のタイトル解決を省く）
+SHEET_NAME = "Sheet1"
+READ_RANGE = f"{SHEET_NAME}!A:E"
+
+# --- メッセージ定型文（呼び出しごとの f-string 再構築を避ける） ---
+RESERVE_OK = "✅ 予約者「{}」として {}（{}）を登録しました！"
+RESERVE_ERR = "❌ エラーが発生しました: {}"
+CANCEL_NOT_FOUND = "❌ 予約者「{}」の {} の予約は見つかりませんでした。"
+CANCEL_OK = "🗑️ 予約者「{}」の {} の予約をキャンセルしました。"
+NO_RESERVATIONS = "📭 現在、予約はありません。"
+LIST_HEADER = "📋 **予約一覧**"
+LIST_LINE = "- 予約者：{}｜メニュー：{}｜時間：{}"
+
 # --- Discord設定 ---
+# スラッシュコマンドのみなので message_content インテントは不要
 intents = discord.Intents.default()
-intents.message_content = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
 # --- Google Sheets接続 ---
+# 認証情報は import 時に一度だけ読み込む（鍵ファイルの再読込・再パースをしない）。
+# アクセストークンの更新は AuthorizedHttp が同じインスタンス上で行う。
+CREDS = service_account.Credentials.from_service_account_file(
+    CREDENTIALS_PATH,
+    scopes=["https://www.googleapis.com/auth/spreadsheets"]
+)
+
+_SHEET = None
+
 def get_sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        CREDENTIALS_PATH,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    service = build("sheets", "v4", credentials=creds)
-    return service.spreadsheets()
+    """Sheets APIサービスを取得（初回のみ初期化して以降は使い回す）"""
+    global _SHEET
+    if _SHEET is None:
+        # keep-alive な HTTP を 1 本使い回して TLS ハンドシェイクを毎回払わない
+        authed_http = AuthorizedHttp(CREDS, http=httplib2.Http(timeout=10))
+        # static_discovery=True でライブラリ同梱のディスカバリ文書を使い、
+        # 起動時のネットワークフェッチとファイルキャッシュ探索を両方省く
+        service = build(
+            "sheets", "v4",
+            http=authed_http,
+            cache_discovery=False,
+            static_discovery=True,
+        )
+        _SHEET = service.spreadsheets()
+    return _SHEET
+
+_VALUES = None
+
+def get_values_resource():
+    """values() リソースも作り直さずに使い回す（appendのホットパス向け）"""
+    global _VALUES
+    if _VALUES is None:
+        _VALUES = get_sheets_service().values()
+    return _VALUES
+
+# httplib2.Http はスレッドセーフではないので、Sheets 呼び出しは専用の 1 スレッドに寄せる
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+class RateLimiter:
+    """毎秒 1 トークン補充の簡易トークンバケット（Sheets の 60 req/分 制限対策）"""
+
+    def __init__(self, rate_limit=60):
+        self._queue = asyncio.Queue(maxsize=rate_limit)
+        for _ in range(rate_limit):
+            self._queue.put_nowait(None)
+        self._rate = rate_limit
+        self._task = None
+
+    async def _refill(self):
+        while True:
+            await asyncio.sleep(60 / self._rate)
+            try:
+                self._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    async def acquire(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refill())
+        await self._queue.get()
+
+limiter = RateLimiter(rate_limit=60)
+
+async def run_sheets(request, retries=3):
+    """googleapiclient の同期 execute() をスレッドに逃がしてイベントループを止めない
+
+    トークンバケットで呼び出し頻度を抑え、429/5xx は指数バックオフで再試行する。
+    """
+    loop = asyncio.get_running_loop()
+    op = getattr(request, "methodId", "sheets.rpc")
+    for attempt in range(retries):
+        await limiter.acquire()
+        start = perf_counter()
+        try:
+            result = await loop.run_in_executor(_SHEETS_EXECUTOR, request.execute)
+        except HttpError as e:
+            log.warning("%s failed after %.3fs (status=%s, attempt=%d)",
+                        op, perf_counter() - start, e.resp.status, attempt + 1)
+            if attempt + 1 < retries and e.resp.status in (429, 500, 503):
+                await asyncio.sleep(2 ** attempt)
+                continue
+            raise
+        else:
+            log.debug("%s took %.3fs", op, perf_counter() - start)
+            return result
+
+# --- シート内容のキャッシュ ---
+CACHE_TTL = 60.0  # 秒
+
+_cache = None
+_cache_ts = 0.0
+_cache_lock = asyncio.Lock()
+
+# (予約者名, 時間) → 行番号 の索引。cancel の線形探索を O(1) にする
+_index = {}
+
+def _rebuild_index():
+    global _index
+    _index = {(r[0], r[2]): i + 1 for i, r in enumerate(_cache) if len(r) >= 3}
+
+# cancel の 行特定 → deleteDimension → キャッシュ更新 を直列化するロック。
+# 並行キャンセルでは先行の削除で行番号が繰り上がるため、同時に走らせると
+# 2 本目が無関係な行を消してしまう
+_cancel_lock = asyncio.Lock()
+
+# 進行中の取得タスク。同時に来た読み取りはこれを共有して 1 RPC にまとめる
+_fetch_task = None
+
+async def _fetch_rows():
+    sheet = get_sheets_service()
+    # 実際に使う A〜D 列だけを、values のみのレスポンスで取得する
+    result = await run_sheets(sheet.values().get(
+        spreadsheetId=SPREADSHEET_ID,
+        range=READ_RANGE,
+        majorDimension="ROWS",
+        fields="values"
+    ))
+    return result.get("values", [])
+
+async def get_rows(force=False):
+    """シートの全行を取得（TTL 内はキャッシュを返して API 呼び出しを節約）"""
+    global _cache, _cache_ts, _fetch_task
+    if not force and _cache is not None and monotonic() - _cache_ts < CACHE_TTL:
+        return _cache
+
+    # 取得中なら相乗りし、そうでなければ自分が取得役になる
+    if _fetch_task is None:
+        _fetch_task = asyncio.create_task(_fetch_rows())
+    task = _fetch_task
+    try:
+        rows = await task
+    finally:
+        if _fetch_task is task:
+            _fetch_task = None
+
+    async with _cache_lock:
+        _cache = rows
+        _cache_ts = monotonic()
+        _rebuild_index()
+        return _cache
+
+# --- 予約書き込みのバッチング ---
+APPEND_BATCH_MAX = 20
+APPEND_MAX_WAIT = 0.5  # 秒
+
+_append_queue = asyncio.Queue()
+_append_task = None
+
+async def _append_flusher():
+    """キューに溜まった予約行を 1 回の append にまとめて書き込む"""
+    while True:
+        row, done = await _append_queue.get()
+        rows = [row]
+        waiters = [done]
+        # 少しだけ待って、同時に来た予約を同じリクエストに相乗りさせる
+        deadline = monotonic() + APPEND_MAX_WAIT
+        while len(rows) < APPEND_BATCH_MAX:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row, done = await asyncio.wait_for(_append_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            rows.append(row)
+            waiters.append(done)
+
+        try:
+            # fields を絞ってレスポンスを最小限にする（結果は使わない）
+            await run_sheets(get_values_resource().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range=SHEET_NAME,
+                valueInputOption="USER_ENTERED",
+                body={"values": rows},
+                fields="spreadsheetId"
+            ))
+        except Exception as e:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+
+async def append_reservation(row):
+    """予約行をキューに入れ、まとめ書き込みの完了を待つ"""
+    done = asyncio.get_running_loop().create_future()
+    await _append_queue.put((row, done))
+    await done
 
 # --- Botイベント ---
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
+    # 起動時に一度だけ初期化しておくと、最初のコマンドが速くなる
+    get_sheets_service()
+    global _append_task
+    if _append_task is None:
+        _append_task = asyncio.create_task(_append_flusher())
+    try:
+        synced = await bot.tree.sync()
+        print(f"🔁 Slash commands synced ({len(synced)} commands)")
+    except Exception as e:
+        print(f"⚠️ Sync failed: {e}")
 
 # --- コマンド ---
-@bot.command()
-async def ping(ctx):
-    await ctx.send("🏓 Pong!")
+@bot.tree.command(name="ping", description="疎通確認")
+async def ping(interaction: discord.Interaction):
+    await interaction.response.send_message("🏓 Pong!")
 
-@bot.command()
-async def reserve(ctx, reserver: str, name: str, time: str):
+@bot.tree.command(name="reserve", description="予約を登録します")
+async def reserve(interaction: discord.Interaction, reserver: str, name: str, time: str):
     """予約を登録"""
-    sheet = get_sheets_service()
-    values = [[reserver, name, time, ctx.author.name]]
+    # 先に defer しておけば Sheets 待ちの間も「考え中…」が出る
+    await interaction.response.defer(thinking=True)
+
+    # E 列に安定した行 ID を持たせておく（行番号ズレに依存しないため）
+    row = [reserver, name, time, interaction.user.name, uuid4().hex]
 
     try:
-        sheet.values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range="Sheet1",
-            valueInputOption="USER_ENTERED",
-            body={"values": values}
-        ).execute()
-        await ctx.send(f"✅ 予約者「{reserver}」として {name}（{time}）を登録しました！")
+        await append_reservation(row)
+        # キャッシュにも反映しておくと直後の list / cancel が再取得せずに済む
+        async with _cache_lock:
+            if _cache is not None:
+                _cache.append(row)
+                _index[(reserver, time)] = len(_cache)
+        await interaction.followup.send(RESERVE_OK.format(reserver, name, time))
     except Exception as e:
-        await ctx.send(f"❌ エラーが発生しました: {e}")
-        print(e)
+        await interaction.followup.send(RESERVE_ERR.format(e))
+        log.exception("予約の登録に失敗しました")
 
-@bot.command()
-async def cancel(ctx, reserver: str, time: str):
+@bot.tree.command(name="cancel", description="予約者名と時間でキャンセルします")
+async def cancel(interaction: discord.Interaction, reserver: str, time: str):
     """予約者名と時間でキャンセル"""
-    sheet = get_sheets_service()
-    result = sheet.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range="Sheet1"
-    ).execute()
+    await interaction.response.defer(thinking=True)
 
-    values = result.get("values", [])
-    if not values:
-        await ctx.send("📭 現在、予約はありません。")
-        return
+    async with _cancel_lock:
+        sheet = get_sheets_service()
+        values = await get_rows()
+        if not values:
+            await interaction.followup.send(NO_RESERVATIONS)
+            return
 
-    # 行を検索
-    target_index = None
-    for i, row in enumerate(values):
-        # [予約者名, 内容, 時間, Discordユーザー]
-        if len(row) >= 3 and row[0] == reserver and row[2] == time:
-            target_index = i + 1
-            break
+        # 索引から行番号を引く（[予約者名, 内容, 時間, Discordユーザー, 行ID]）
+        target_index = _index.get((reserver, time))
 
-    if target_index is None:
-        await ctx.send(f"❌ 予約者「{reserver}」の {time} の予約は見つかりませんでした。")
-        return
+        if target_index is None:
+            await interaction.followup.send(CANCEL_NOT_FOUND.format(reserver, time))
+            return
 
-    # 削除処理
-    sheet.values().clear(
-        spreadsheetId=SPREADSHEET_ID,
-        range=f"Sheet1!A{target_index}:D{target_index}"
-    ).execute()
+        target_row = values[target_index - 1]
+        row_id = target_row[4] if len(target_row) >= 5 else None
+
+        # 予約はバッチでまとめて書き込まれるため、キャッシュ上の並びと
+        # シート上の並びが一致しない瞬間がある。E 列の行 ID を持つ行は、
+        # 削除直前に取り直した最新の行一覧から ID で行番号を確定させる
+        if row_id is not None:
+            values = await get_rows(force=True)
+            target_index = next(
+                (i + 1 for i, r in enumerate(values) if len(r) >= 5 and r[4] == row_id),
+                None,
+            )
+            if target_index is None:
+                await interaction.followup.send(CANCEL_NOT_FOUND.format(reserver, time))
+                return
 
-    await ctx.send(f"🗑️ 予約者「{reserver}」の {time} の予約をキャンセルしました。")
+        # 行ごと削除（clear と違って空行が残らず、1 RPC で済む）
+        await run_sheets(sheet.batchUpdate(
+            spreadsheetId=SPREADSHEET_ID,
+            body={"requests": [{
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": 0,
+                        "dimension": "ROWS",
+                        "startIndex": target_index - 1,
+                        "endIndex": target_index
+                    }
+                }
+            }]}
+        ))
 
-@bot.command()
-async def list(ctx):
+        # 行番号がずれるので、キャッシュから行を抜いて索引を作り直す
+        async with _cache_lock:
+            if _cache is not None:
+                del _cache[target_index - 1]
+                _rebuild_index()
+
+    await interaction.followup.send(CANCEL_OK.format(reserver, time))
+
+@bot.tree.command(name="list", description="予約一覧を表示します")
+async def list_reservations(interaction: discord.Interaction):
     """Google Sheets から予約一覧を表示"""
-    sheet = get_sheets_service()
-    result = sheet.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range="sheet1"  # 実際のシート名に合わせて変更
-    ).execute()
+    await interaction.response.defer(thinking=True)
 
-    values = result.get("values", [])
+    values = await get_rows()
 
     if not values:
-        await ctx.send("📭 現在、予約はありません。")
+        await interaction.followup.send(NO_RESERVATIONS)
         return
 
-    msg = "📋 **予約一覧**\n"
-    for row in values:
-        if len(row) >= 3:
-            reserver = row[0]
-            menu = row[1]
-            time = row[2]
-            msg += f"- 予約者：{reserver}｜メニュー：{menu}｜時間：{time}\n"
+    lines = [LIST_HEADER]
+    lines.extend(
+        LIST_LINE.format(row[0], row[1], row[2])
+        for row in values if len(row) >= 3
+    )
+    msg = "\n".join(lines)
 
-    await ctx.send(msg)
+    # Discord の 2000 文字制限に合わせて行単位で分割送信
+    while msg:
+        if len(msg) <= 2000:
+            await interaction.followup.send(msg)
+            break
+        cut = msg.rfind("\n", 0, 2000)
+        if cut <= 0:
+            cut = 2000
+        await interaction.followup.send(msg[:cut])
+        msg = msg[cut:].lstrip("\n")
 
 # --- 起動 ---
+logging.basicConfig(level=logging.INFO)
 bot.run(TOKEN)
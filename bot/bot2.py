@@ -1,14 +1,18 @@
+import asyncio
 import json
 import os
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Sequence, Tuple
+import random
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import discord
 from discord import app_commands, ui
-from discord.ext import commands, tasks
+from discord.ext import commands
 from dotenv import load_dotenv
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from aiohttp import web
 
 # --- 環境変数 ---
@@ -65,15 +69,15 @@ def resolve_cafe_category(guild: Optional[discord.Guild]) -> Optional[discord.Ca
         if isinstance(ch, discord.CategoryChannel):
             return ch
     if CAFE_CATEGORY_NAME:
-        # 完全一致を優先
-        for cat in guild.categories:
-            if cat.name == CAFE_CATEGORY_NAME:
-                return cat
-        # 部分一致も試す
+        # 1 パスで完全一致を優先しつつ部分一致の候補も拾う
         lowered = CAFE_CATEGORY_NAME.lower()
+        partial_hit = None
         for cat in guild.categories:
-            if lowered in cat.name.lower():
+            if cat.name == CAFE_CATEGORY_NAME:
                 return cat
+            if partial_hit is None and lowered in cat.name.lower():
+                partial_hit = cat
+        return partial_hit
     return None
 
 
@@ -88,8 +92,12 @@ def _category_hint(guild: Optional[discord.Guild]) -> str:
     )
 
 
+# プラットフォームが数秒おきに叩くので、毎回のテキストエンコードすら省く
+_HEALTH_BODY = b"ok"
+
+
 async def _health_handler(request: web.Request) -> web.Response:
-    return web.Response(text="ok")
+    return web.Response(body=_HEALTH_BODY, content_type="text/plain")
 
 
 async def _start_health_server():
@@ -116,16 +124,60 @@ _health_app_started = False
 
 
 # --- ユーティリティ ---
+@lru_cache(maxsize=1024)
 def parse_time(text: str) -> datetime.time:
-    return datetime.strptime(text, "%H:%M").time()
+    # strptime はロケール処理込みで重い。時刻は "HH:MM" 固定なので直接組み立てる。
+    # 入力の時刻はよく重複する（13:00, 14:00, …）ので結果もキャッシュする
+    hh, mm = text.split(":")
+    return dt_time(int(hh), int(mm))
 
 
-def overlaps(start_a: str, end_a: str, start_b: str, end_b: str) -> bool:
-    sa = parse_time(start_a)
-    ea = parse_time(end_a)
-    sb = parse_time(start_b)
-    eb = parse_time(end_b)
-    return max(sa, sb) < min(ea, eb)
+def _parse_datetime(day: str, hhmm: str) -> Optional[datetime]:
+    """"YYYY/MM/DD" と "HH:MM" を strptime を通さず JST の datetime にする"""
+    try:
+        return datetime(
+            int(day[0:4]), int(day[5:7]), int(day[8:10]),
+            int(hhmm[0:2]), int(hhmm[3:5]),
+            tzinfo=JST,
+        )
+    except (ValueError, IndexError):
+        return None
+
+
+def _parse_participant_ids(raw: str) -> List[int]:
+    """参加者JSON セルを int の ID リストに落とす（キャッシュ充填時に 1 回だけ呼ぶ）"""
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(data, list):
+        return []
+    ids: List[int] = []
+    for item in data:
+        member_id = item.get("id") if isinstance(item, dict) else item
+        try:
+            ids.append(int(member_id))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def is_slot_available_indexed(
+    index: Dict[Tuple[str, str], List[Tuple[datetime.time, datetime.time]]],
+    channel_name: str,
+    day: str,
+    start: datetime.time,
+    end: datetime.time,
+) -> bool:
+    spans = index.get((channel_name, day))
+    if not spans:
+        return True
+    # 開始時刻が end 以降の予約は重ならないので、二分探索でそこまでに絞る
+    pos = bisect_left(spans, (end,))
+    for span_start, span_end in spans[:pos]:
+        if max(start, span_start) < min(end, span_end):
+            return False
+    return True
 
 
 def ensure_token() -> None:
@@ -138,14 +190,16 @@ def ensure_token() -> None:
 
 
 def is_past_reservation(day: str, end: str) -> bool:
-    try:
-        end_dt = datetime.strptime(f"{day} {end}", "%Y/%m/%d %H:%M").replace(tzinfo=JST)
-    except ValueError:
+    end_dt = _parse_datetime(day, end)
+    if end_dt is None:
         return False
     return end_dt < datetime.now(JST)
 
 
 def load_credentials():
+    # google-auth は import が重いので、実際に認証するときまで読み込まない
+    from google.oauth2 import service_account
+
     # 1. GOOGLE_CREDENTIALS_JSON（環境変数）のチェック
     json_blob = os.getenv("GOOGLE_CREDENTIALS_JSON")
     if json_blob:
@@ -174,6 +228,9 @@ def load_credentials():
 
     raise RuntimeError("Google 認証ファイルが見つかりません。")
 def load_credentials():
+    # google-auth は import が重いので、実際に認証するときまで読み込まない
+    from google.oauth2 import service_account
+
     # 1. GOOGLE_CREDENTIALS_JSON（環境変数）のチェック
     json_blob = os.getenv("GOOGLE_CREDENTIALS_JSON")
     if json_blob:
@@ -204,17 +261,121 @@ def load_credentials():
 
 
 # --- Google Sheet 操作 ---
+# 行キャッシュの有効期限（秒）。この間は values.get を再発行しない
+ROWS_CACHE_TTL = 15.0
+
+# Google API への同時リクエストはこの数まで（バーストで 429 を引かないため）
+_SHEETS_SEM = asyncio.Semaphore(4)
+_SHEETS_MAX_ATTEMPTS = 5
+
+# httplib2.Http はスレッドセーフではないので、Sheets 呼び出しは専用の 1 スレッドに
+# 寄せる（キャッシュの更新も同じスレッドに直列化される）。セマフォは待ち行列の
+# 長さを抑える役目で残す
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+
+async def _call_sheets(fn, *args):
+    """同期の Sheets 呼び出しをスレッドで実行しつつ、同時数を絞り 429/503 は再試行する"""
+    from googleapiclient.errors import HttpError
+
+    async with _SHEETS_SEM:
+        for attempt in range(_SHEETS_MAX_ATTEMPTS):
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    _SHEETS_EXECUTOR, fn, *args
+                )
+            except HttpError as exc:
+                status = getattr(exc.resp, "status", None)
+                if status not in (429, 503) or attempt + 1 >= _SHEETS_MAX_ATTEMPTS:
+                    raise
+                # 指数バックオフ＋ジッタで一斉再試行を散らす
+                await asyncio.sleep(2 ** attempt + random.random())
+
+# 9 列に満たない行の穴埋め用。毎行 [""] * n のリストを作らずに済む
+_EMPTY9 = ("",) * 9
+
+
+class CachedRow(NamedTuple):
+    """キャッシュ充填時に日時などを解析済みにした行（リマインド用）"""
+
+    row_index: int
+    user: str
+    channel: str
+    day: str
+    start: str
+    end: str
+    start_dt: Optional[datetime]
+    owner_id: int
+    participant_ids: Tuple[int, ...]
+    reminded: bool
+
+
 class SheetOperations:
     def __init__(self) -> None:
         self.service = None
         self.sheet_name = SHEET_NAME
         self.header = ["予約者", "チャンネル", "日付", "開始", "終了", "予約者ID", "参加者JSON", "作成日時", "reminded"]
         self.sheet_id: Optional[int] = None
+        # fetch_rows の結果をキャッシュし、書き込み時はローカルで更新して鮮度を保つ
+        self._rows_cache: Optional[List[Tuple[int, Tuple[str, ...]]]] = None
+        self._rows_cache_ts: float = 0.0
+        # ヘッダ行の確認は一度通れば十分（毎回 get+update を挟まない）
+        self._header_checked = False
+        # 次に append される行の番号（キャッシュ充填時に確定させる）
+        self._next_row: Optional[int] = None
+        # sheet_id とヘッダ確認済みフラグは再起動をまたいで持ち越す
+        # （Render の再起動サイクルで毎回 spreadsheets.get を撃ち直さないため）
+        self._state_path = ".sheets_state.json"
+        self._load_state()
+        # 日付 → 解析済み行 の索引。リマインドは当日分だけ見ればよい
+        self._by_day: Dict[str, List[CachedRow]] = {}
+
+    def _load_state(self) -> None:
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        sheet_id = state.get("sheet_id")
+        if isinstance(sheet_id, int):
+            self.sheet_id = sheet_id
+        self._header_checked = bool(state.get("header_ok"))
+
+    def _save_state(self) -> None:
+        try:
+            with open(self._state_path, "w", encoding="utf-8") as f:
+                json.dump({"sheet_id": self.sheet_id, "header_ok": self._header_checked}, f)
+        except OSError:
+            pass
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄する（書き込み失敗などで実シートとずれた可能性があるとき用）"""
+        self._rows_cache = None
+        self._rows_cache_ts = 0.0
+        self._next_row = None
 
     def _get_api(self):
         if not self.service:
+            # discovery のサブモジュール群を起動時に引き込まないよう遅延 import
+            from googleapiclient.discovery import build, build_from_document
+
             creds = load_credentials()
-            self.service = build("sheets", "v4", credentials=creds).spreadsheets()
+            # 同梱したディスカバリ文書があればそれを読む（ネットワーク I/O ゼロ）。
+            # 無ければ static_discovery=True でライブラリ同梱版にフォールバックし、
+            # どちらの経路でも起動直後の ~1 秒のディスカバリ取得を払わない
+            doc_path = os.path.join(os.path.dirname(__file__), "sheets_v4.json")
+            if os.path.exists(doc_path):
+                with open(doc_path, encoding="utf-8") as f:
+                    self.service = build_from_document(
+                        f.read(), credentials=creds
+                    ).spreadsheets()
+            else:
+                self.service = build(
+                    "sheets", "v4",
+                    credentials=creds,
+                    cache_discovery=False,
+                    static_discovery=True,
+                ).spreadsheets()
         return self.service
 
     def _ensure_sheet_id(self) -> int:
@@ -226,12 +387,16 @@ class SheetOperations:
             props = sheet.get("properties", {})
             if props.get("title") == self.sheet_name:
                 self.sheet_id = props.get("sheetId", 0)
+                self._save_state()
                 return self.sheet_id
         # fallback to first sheet
         self.sheet_id = info.get("sheets", [{}])[0].get("properties", {}).get("sheetId", 0)
+        self._save_state()
         return self.sheet_id
 
     def ensure_header_row(self) -> None:
+        if self._header_checked:
+            return
         api = self._get_api()
         result = api.values().get(
             spreadsheetId=SPREADSHEET_ID, range=f"{self.sheet_name}!A1:I1"
@@ -244,6 +409,8 @@ class SheetOperations:
                 valueInputOption="RAW",
                 body={"values": [self.header]},
             ).execute()
+            self._header_checked = True
+            self._save_state()
             return
         if values[0] != self.header:
             sheet_id = self._ensure_sheet_id()
@@ -271,23 +438,61 @@ class SheetOperations:
                 valueInputOption="RAW",
                 body={"values": [self.header]},
             ).execute()
-
-    def fetch_rows(self) -> List[Tuple[int, List[str]]]:
+        self._header_checked = True
+        self._save_state()
+
+    def _fetch_rows_sync(self) -> List[Tuple[int, Tuple[str, ...]]]:
+        # TTL 内はキャッシュを返す（空き確認はチャンネル数ぶん呼ばれるのでここが効く）
+        if (
+            self._rows_cache is not None
+            and time.monotonic() - self._rows_cache_ts < ROWS_CACHE_TTL
+        ):
+            return self._rows_cache
         self.ensure_header_row()
         api = self._get_api()
+        # A2 始まりでヘッダ行をサーバー側で落とし、UNFORMATTED_VALUE で
+        # サーバー側の書式適用パスを省く（全列プレーンテキストなので等価）
         result = api.values().get(
-            spreadsheetId=SPREADSHEET_ID, range=f"{self.sheet_name}!A:I"
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{self.sheet_name}!A2:I",
+            valueRenderOption="UNFORMATTED_VALUE",
+            dateTimeRenderOption="FORMATTED_STRING",
+            majorDimension="ROWS",
         ).execute()
         rows = result.get("values", [])
-        data: List[Tuple[int, List[str]]] = []
-        for idx, row in enumerate(rows, start=1):
-            if idx == 1:
-                continue
-            padded = row + [""] * max(0, 9 - len(row))
-            data.append((idx, padded[:9]))
+        data: List[Tuple[int, Tuple[str, ...]]] = []
+        for idx, row in enumerate(rows, start=2):
+            # タプル連結＋スライスで一発。リスト確保もスライス後の再確保もない
+            data.append((idx, (*row, *_EMPTY9)[:9]))
+        self._rows_cache = data
+        self._rows_cache_ts = time.monotonic()
+        self._next_row = data[-1][0] + 1 if data else 2
+        self._rebuild_day_index()
         return data
 
-    def append_row(
+    def _rebuild_day_index(self) -> None:
+        by_day: Dict[str, List[CachedRow]] = {}
+        for idx, row in self._rows_cache or []:
+            day = row[2]
+            if not day:
+                continue
+            by_day.setdefault(day, []).append(
+                CachedRow(
+                    row_index=idx,
+                    user=row[0],
+                    channel=row[1],
+                    day=day,
+                    start=row[3],
+                    end=row[4],
+                    start_dt=_parse_datetime(day, row[3]),
+                    owner_id=int(row[5]) if (row[5] or "").isdigit() else 0,
+                    participant_ids=tuple(_parse_participant_ids(row[6])),
+                    reminded=(row[8] or "").strip().lower() == "true",
+                )
+            )
+        self._by_day = by_day
+
+    def _append_row_sync(
         self,
         user_mention: str,
         channel_name: str,
@@ -296,6 +501,9 @@ class SheetOperations:
         end: str,
         user_id: int,
     ) -> int:
+        # 行番号は updatedRange の文字列解析ではなく、キャッシュの末尾行から導く
+        if self._next_row is None:
+            self._fetch_rows_sync()
         self.ensure_header_row()
         api = self._get_api()
         values = [
@@ -309,27 +517,21 @@ class SheetOperations:
             datetime.now(JST).strftime("%Y/%m/%d %H:%M:%S"),
             "FALSE",
         ]
-        response = (
-            api.values()
-            .append(
-                spreadsheetId=SPREADSHEET_ID,
-                range=f"{self.sheet_name}!A:H",
-                valueInputOption="USER_ENTERED",
-                body={"values": [values]},
-            )
-            .execute()
-        )
-        updated = response.get("updates", {})
-        updated_range = updated.get("updatedRange", "")
-        row_number = 0
-        try:
-            row_part = updated_range.split("!")[1]
-            row_number = int(row_part.split(":")[0][1:])
-        except Exception:
-            row_number = 0
+        row_number = self._next_row
+        api.values().append(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{self.sheet_name}!A:H",
+            valueInputOption="USER_ENTERED",
+            body={"values": [values]},
+        ).execute()
+        self._next_row = row_number + 1
+        # キャッシュにも追記して、直後の空き確認・一覧が再取得せずに済むようにする
+        if self._rows_cache is not None:
+            self._rows_cache.append((row_number, tuple(values)))
+            self._rebuild_day_index()
         return row_number
 
-    def update_participants(self, row_index: int, participants: Sequence[Dict[str, str]]) -> None:
+    def _update_participants_sync(self, row_index: int, participants: Sequence[Dict[str, str]]) -> None:
         api = self._get_api()
         payload = json.dumps(list(participants), ensure_ascii=False)
         api.values().update(
@@ -338,17 +540,27 @@ class SheetOperations:
             valueInputOption="RAW",
             body={"values": [[payload]]},
         ).execute()
+        self._patch_cached_cell(row_index, 6, payload)
 
-    def mark_reminded(self, row_index: int) -> None:
+    def _mark_reminded_sync(self, row_indices: Sequence[int]) -> None:
+        if not row_indices:
+            return
         api = self._get_api()
-        api.values().update(
+        # 1 行ずつ update せず、まとめて 1 回の batchUpdate にする
+        api.values().batchUpdate(
             spreadsheetId=SPREADSHEET_ID,
-            range=f"{self.sheet_name}!I{row_index}",
-            valueInputOption="RAW",
-            body={"values": [["TRUE"]]},
+            body={
+                "valueInputOption": "RAW",
+                "data": [
+                    {"range": f"{self.sheet_name}!I{idx}", "values": [["TRUE"]]}
+                    for idx in row_indices
+                ],
+            },
         ).execute()
+        for idx in row_indices:
+            self._patch_cached_cell(idx, 8, "TRUE")
 
-    def delete_row(self, row_index: int) -> None:
+    def _delete_row_sync(self, row_index: int) -> None:
         sheet_id = self._ensure_sheet_id()
         api = self._get_api()
         api.batchUpdate(
@@ -368,21 +580,46 @@ class SheetOperations:
                 ]
             },
         ).execute()
-
-    def is_slot_available(self, channel_name: str, day: str, start: str, end: str) -> bool:
-        for _, row in self.fetch_rows():
+        # 削除後は後続行の行番号がひとつ繰り上がる
+        if self._rows_cache is not None:
+            self._rows_cache = [
+                (idx - 1 if idx > row_index else idx, row)
+                for idx, row in self._rows_cache
+                if idx != row_index
+            ]
+            self._rebuild_day_index()
+
+    def _patch_cached_cell(self, row_index: int, col: int, value: str) -> None:
+        if self._rows_cache is None:
+            return
+        for pos, (idx, row) in enumerate(self._rows_cache):
+            if idx == row_index:
+                self._rows_cache[pos] = (idx, row[:col] + (value,) + row[col + 1:])
+                self._rebuild_day_index()
+                return
+
+    def _build_availability_index_sync(self) -> Dict[Tuple[str, str], List[Tuple[datetime.time, datetime.time]]]:
+        """(チャンネル名, 日付) → 開始時刻でソートした予約区間リスト の索引を作る
+
+        行を 1 回走査するだけなので、チャンネル数ぶん全行をなめ直すより安い。
+        """
+        index: Dict[Tuple[str, str], List[Tuple[datetime.time, datetime.time]]] = {}
+        for _, row in self._fetch_rows_sync():
             row_channel, row_day, row_start, row_end = row[1], row[2], row[3], row[4]
             if not row_channel or not row_day:
                 continue
-            if row_channel != channel_name or row_day != day:
+            try:
+                span = (parse_time(row_start), parse_time(row_end))
+            except ValueError:
                 continue
-            if overlaps(start, end, row_start, row_end):
-                return False
-        return True
+            index.setdefault((row_channel, row_day), []).append(span)
+        for spans in index.values():
+            spans.sort()
+        return index
 
-    def find_by_user(self, user_id: int) -> List[Dict[str, str]]:
+    def _find_by_user_sync(self, user_id: int) -> List[Dict[str, str]]:
         results: List[Dict[str, str]] = []
-        for idx, row in self.fetch_rows():
+        for idx, row in self._fetch_rows_sync():
             if row[5] != str(user_id):
                 continue
             results.append(
@@ -399,11 +636,72 @@ class SheetOperations:
             )
         return results
 
+    # --- async ラッパー ---
+    # Sheets の HTTP 呼び出しは 1 回 200〜500ms ほどイベントループを止めるので、
+    # コルーチンからはスレッドに逃がした これらのラッパー経由で呼ぶ
+    async def fetch_rows(self) -> List[Tuple[int, Tuple[str, ...]]]:
+        return await _call_sheets(self._fetch_rows_sync)
+
+    async def rows_for_day(self, day: str) -> List[CachedRow]:
+        # 鮮度確認（TTL 内ならキャッシュのまま）をしてから当日分だけ返す
+        await _call_sheets(self._fetch_rows_sync)
+        return self._by_day.get(day, [])
+
+    def next_reminder_due(self, now: datetime) -> Optional[datetime]:
+        """次にリマインドを送るべき時刻（未通知予約の開始 N 分前）を返す"""
+        due: Optional[datetime] = None
+        for rows in self._by_day.values():
+            for row in rows:
+                if row.reminded or row.start_dt is None or row.start_dt < now:
+                    continue
+                candidate = row.start_dt - timedelta(minutes=REMINDER_MINUTES_BEFORE)
+                if due is None or candidate < due:
+                    due = candidate
+        return due
+
+    async def append_row(
+        self,
+        user_mention: str,
+        channel_name: str,
+        day: str,
+        start: str,
+        end: str,
+        user_id: int,
+    ) -> int:
+        row_number = await _call_sheets(
+            self._append_row_sync, user_mention, channel_name, day, start, end, user_id
+        )
+        _notify_reminder_change()
+        return row_number
+
+    async def update_participants(self, row_index: int, participants: Sequence[Dict[str, str]]) -> None:
+        await _call_sheets(self._update_participants_sync, row_index, participants)
+
+    async def mark_reminded(self, row_indices: Sequence[int]) -> None:
+        await _call_sheets(self._mark_reminded_sync, row_indices)
+
+    async def delete_row(self, row_index: int) -> None:
+        await _call_sheets(self._delete_row_sync, row_index)
+        _notify_reminder_change()
+
+    async def build_availability_index(self) -> Dict[Tuple[str, str], List[Tuple[datetime.time, datetime.time]]]:
+        return await _call_sheets(self._build_availability_index_sync)
+
+    async def find_by_user(self, user_id: int) -> List[Dict[str, str]]:
+        return await _call_sheets(self._find_by_user_sync, user_id)
+
 
 sheets = SheetOperations()
 
 
 # --- UI コンポーネント ---
+# 毎回 Embed を組み立て直さず、雛形の shallow copy にフィールドだけ足す
+_ANNOUNCE_EMBED_TEMPLATE = discord.Embed(
+    title="☕ 予約が作成されました",
+    color=discord.Color.blurple(),
+)
+_CANCEL_EMBED_TEMPLATE = discord.Embed(title="予約内容", color=discord.Color.orange())
+
 class TimeInputModal(ui.Modal, title="☕ 予約時間を入力"):
     def __init__(self, user: discord.User):
         super().__init__(timeout=300)
@@ -436,9 +734,11 @@ class TimeInputModal(ui.Modal, title="☕ 予約時間を入力"):
         candidates = [
             ch for ch in category.channels if isinstance(ch, discord.VoiceChannel)
         ]
+        # 全行を 1 回読んで索引化し、チャンネルごとの判定は索引引きだけにする
+        index = await sheets.build_availability_index()
         available = [
             ch for ch in candidates
-            if sheets.is_slot_available(ch.name, self.day.value, self.start_time.value, self.end_time.value)
+            if is_slot_available_indexed(index, ch.name, self.day.value, start_t, end_t)
         ]
         if not available:
             await interaction.response.send_message("指定時間に空いている席がありません。", ephemeral=True)
@@ -472,12 +772,12 @@ class ChannelSelect(ui.Select):
             return
         await interaction.response.defer(ephemeral=True)
         channel_id = int(self.values[0])
-        channel = discord.utils.get(self.parent_view.channels, id=channel_id)
+        channel = self.parent_view._channels_by_id.get(channel_id)
         if not channel:
             await interaction.followup.send("チャンネルが見つかりません。", ephemeral=True)
             return
 
-        row_index = sheets.append_row(
+        row_index = await sheets.append_row(
             user_mention=interaction.user.mention,
             channel_name=channel.name,
             day=self.parent_view.day,
@@ -516,6 +816,7 @@ class ChannelSelectView(ui.View):
         super().__init__(timeout=180)
         self.user = user
         self.channels = list(channels)
+        self._channels_by_id = {ch.id: ch for ch in self.channels}
         self.day = day
         self.start = start
         self.end = end
@@ -538,7 +839,7 @@ class ParticipantSelect(ui.UserSelect):
         participants = [
             {"id": str(member.id), "name": member.mention} for member in self.values
         ]
-        sheets.update_participants(self.parent_view.row_index, participants)
+        await sheets.update_participants(self.parent_view.row_index, participants)
         names = ", ".join(member.mention for member in self.values) if self.values else "なし"
         await self.parent_view._send_announce(participants_text=names)
         await interaction.response.edit_message(view=None)
@@ -568,11 +869,8 @@ class ParticipantSelectView(ui.View):
     async def _send_announce(self, participants_text: str):
         if not self.announce_channel:
             return
-        embed = discord.Embed(
-            title="☕ 予約が作成されました",
-            description=f"{self.user_mention} が {self.channel_name} を予約しました。",
-            color=discord.Color.blurple(),
-        )
+        embed = _ANNOUNCE_EMBED_TEMPLATE.copy()
+        embed.description = f"{self.user_mention} が {self.channel_name} を予約しました。"
         embed.add_field(name="日付", value=self.day, inline=True)
         embed.add_field(name="時間", value=f"{self.start}〜{self.end}", inline=True)
         embed.add_field(name="参加者", value=participants_text or "なし", inline=False)
@@ -589,7 +887,7 @@ class CancelButtonView(ui.View):
 
     @ui.button(label="キャンセルする", style=discord.ButtonStyle.danger)
     async def do_cancel(self, interaction: discord.Interaction, _: ui.Button):
-        sheets.delete_row(self.row_index)
+        await sheets.delete_row(self.row_index)
         await interaction.response.edit_message(content="予約をキャンセルしました。", view=None)
 
 
@@ -617,10 +915,14 @@ class ReservationMenu(ui.View):
         await send_cancellation_embeds(interaction)
 
 
+# timeout=None + custom_id 付きなので 1 インスタンスを全メッセージで使い回せる
+MENU_VIEW = ReservationMenu()
+
+
 # --- コマンド & イベント ---
 async def send_cancellation_embeds(interaction: discord.Interaction):
     matches = [
-        res for res in sheets.find_by_user(interaction.user.id)
+        res for res in await sheets.find_by_user(interaction.user.id)
         if not is_past_reservation(res["day"], res["end"])
     ]
     if not matches:
@@ -636,20 +938,26 @@ async def send_cancellation_embeds(interaction: discord.Interaction):
 
     await interaction.response.defer(ephemeral=True)
 
+    prepared = []
     for res in matches:
-        embed = discord.Embed(title="予約内容", color=discord.Color.orange())
+        embed = _CANCEL_EMBED_TEMPLATE.copy()
         embed.add_field(name="チャンネル", value=res["channel"], inline=True)
         embed.add_field(name="日付", value=res["day"], inline=True)
         embed.add_field(name="時間", value=f"{res['start']}〜{res['end']}", inline=True)
         participants = res.get("participants") or "[]"
-        try:
-            parsed_mentions = parse_participant_mentions(participants)
-            mention_text = ", ".join(parsed_mentions) if parsed_mentions else "なし"
-        except json.JSONDecodeError:
-            mention_text = "なし"
+        parsed_mentions = format_mentions(_parse_participant_ids(participants))
+        mention_text = ", ".join(parsed_mentions) if parsed_mentions else "なし"
         embed.add_field(name="参加者", value=mention_text, inline=False)
-        view = CancelButtonView(res["row_index"])
-        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+        prepared.append((embed, CancelButtonView(res["row_index"])))
+
+    # 1 件ずつ往復を待たず並列で送る。Discord のレート制限を踏まないよう同時 5 件まで
+    sem = asyncio.Semaphore(5)
+
+    async def _send(embed: discord.Embed, view: CancelButtonView):
+        async with sem:
+            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+
+    await asyncio.gather(*(_send(embed, view) for embed, view in prepared))
 
 
 @_maybe_guild_scope
@@ -667,60 +975,58 @@ async def reserve_cancel(interaction: discord.Interaction):
 @_maybe_guild_scope
 @bot.tree.command(name="show_menu", description="予約メニューを表示")
 async def show_menu(interaction: discord.Interaction):
-    view = ReservationMenu()
-    await interaction.response.send_message("操作を選んでください。", view=view)
+    await interaction.response.send_message("操作を選んでください。", view=MENU_VIEW)
 
 
 @_maybe_guild_scope
 @bot.tree.command(name="cafebook_panel", description="(互換) 旧コマンド: 予約メニューを表示")
 async def cafebook_panel(interaction: discord.Interaction):
-    view = ReservationMenu()
     try:
-        await interaction.response.send_message("操作を選んでください。", view=view)
+        await interaction.response.send_message("操作を選んでください。", view=MENU_VIEW)
     except discord.NotFound:
         # 古いメッセージや無効トークンで呼ばれた場合は握りつぶす
         return
 
 
+TRIGGER = "カフェ予約"
+TRIGGER_LEN = len(TRIGGER)
+
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author.bot:
         return
-    if message.content.strip() == "カフェ予約":
-        view = ReservationMenu()
-        await message.channel.send("操作を選んでください。", view=view)
+    # 全メッセージで呼ばれるので strip() の確保は最後まで遅らせる。
+    # 長さが足りないメッセージは比較すら不要、完全一致なら strip() も不要
+    content = message.content
+    if (
+        message.guild is not None
+        and len(content) >= TRIGGER_LEN
+        and (content == TRIGGER or content.strip() == TRIGGER)
+    ):
+        await message.channel.send("操作を選んでください。", view=MENU_VIEW)
         return
     await bot.process_commands(message)
 
 
 # --- リマインド ---
-def parse_participant_mentions(raw: str) -> List[str]:
-    try:
-        data = json.loads(raw)
-    except (json.JSONDecodeError, TypeError):
-        return []
-    if not isinstance(data, list):
-        return []
-    mentions: List[str] = []
-    for item in data:
-        if isinstance(item, dict):
-            member_id = item.get("id")
-            name = item.get("name")
-            if member_id:
-                mentions.append(f"<@{member_id}>")
-            elif name:
-                mentions.append(str(name))
-        else:
-            try:
-                member_id = int(item)
-                mentions.append(f"<@{member_id}>")
-            except (TypeError, ValueError):
-                continue
-    return mentions
+def format_mentions(ids: Sequence[int]) -> List[str]:
+    return [f"<@{member_id}>" for member_id in ids]
 
 
-@tasks.loop(minutes=1)
-async def reminder_loop():
+# 予約が近くないときに鮮度確認へ戻るまでの上限（秒）
+REMINDER_RECHECK_SECONDS = 300.0
+
+# 予約の追加・削除でリマインド予定が変わったときに早起きするためのイベント
+_reminder_wake = asyncio.Event()
+_reminder_task: Optional[asyncio.Task] = None
+
+
+def _notify_reminder_change() -> None:
+    _reminder_wake.set()
+
+
+async def _run_reminder_pass():
     if REMINDER_MINUTES_BEFORE <= 0 or REMINDER_CHANNEL_ID <= 0:
         return
     channel = bot.get_channel(REMINDER_CHANNEL_ID)
@@ -732,36 +1038,48 @@ async def reminder_loop():
 
     now = datetime.now(JST)
     today_key = now.strftime("%Y/%m/%d")
-    for row_index, row in sheets.fetch_rows():
-        reminded = (row[8] or "").strip().lower() == "true"
-        if reminded:
-            continue
-        day = row[2]
-        start = row[3]
-        if not day or not start:
-            continue
-        if day != today_key:
+    reminded_rows: List[int] = []
+    # 当日分の解析済み行だけを見る（日時はキャッシュ充填時に解析済み）
+    for row in await sheets.rows_for_day(today_key):
+        if row.reminded or row.start_dt is None:
             continue
-        try:
-            start_dt = datetime.strptime(f"{day} {start}", "%Y/%m/%d %H:%M").replace(tzinfo=JST)
-        except ValueError:
-            continue
-        delta = start_dt - now
+        delta = row.start_dt - now
         if timedelta(0) <= delta <= timedelta(minutes=REMINDER_MINUTES_BEFORE):
-            mentions = [row[0]] + parse_participant_mentions(row[6])
-            mention_text = " ".join(m for m in mentions if m).strip()
+            # dict.fromkeys は挿入順を保ったまま C 側で重複を除く
+            mention_ids = dict.fromkeys((row.owner_id, *row.participant_ids))
+            mention_text = " ".join(f"<@{uid}>" for uid in mention_ids if uid)
             try:
                 await channel.send(
-                    f"{mention_text}\n開始 {REMINDER_MINUTES_BEFORE} 分前です！ {day} {row[3]}〜{row[4]} / {row[1]}"
+                    f"{mention_text}\n開始 {REMINDER_MINUTES_BEFORE} 分前です！ {row.day} {row.start}〜{row.end} / {row.channel}"
                 )
             except discord.HTTPException:
                 continue
-            sheets.mark_reminded(row_index)
+            reminded_rows.append(row.row_index)
+    # シートへの反映は 1 回の batchUpdate にまとめる
+    await sheets.mark_reminded(reminded_rows)
 
 
-@reminder_loop.before_loop
-async def before_reminder_loop():
+async def _reminder_scheduler():
+    """毎分の空回りをやめ、次のリマインド時刻まで眠るスケジューラ"""
     await bot.wait_until_ready()
+    while True:
+        try:
+            await _run_reminder_pass()
+        except Exception as exc:
+            print(f"⚠️ Reminder pass failed: {exc}")
+        now = datetime.now(JST)
+        due = sheets.next_reminder_due(now)
+        if due is None:
+            wait = REMINDER_RECHECK_SECONDS
+        else:
+            # 直近の予定ちょうどまで眠る。キャッシュ外の変化も拾えるよう上限と、
+            # 送信失敗時に回り続けないよう下限を設ける
+            wait = min(max((due - now).total_seconds(), 30.0), REMINDER_RECHECK_SECONDS)
+        _reminder_wake.clear()
+        try:
+            await asyncio.wait_for(_reminder_wake.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
 
 
 @bot.event
@@ -785,9 +1103,10 @@ async def on_ready():
             print(f"🔁 Globally synced {len(synced)} commands")
             fetched = await bot.tree.fetch_commands()
             print(f"📡 Remote global commands: {[c.name for c in fetched]}")
-        bot.add_view(ReservationMenu())
-        if not reminder_loop.is_running():
-            reminder_loop.start()
+        bot.add_view(MENU_VIEW)
+        global _reminder_task
+        if _reminder_task is None:
+            _reminder_task = asyncio.create_task(_reminder_scheduler())
         print(f"☕ bot ready as {bot.user} (TEST_SERVER={TEST_SERVER}, GUILD_ID={GUILD_ID})")
         await _start_health_server()
     except Exception as exc:
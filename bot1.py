@@ -1,11 +1,23 @@
+import asyncio
+import hashlib
 import os
 import json
+import random
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+
 import discord
+import httplib2
 from discord.ext import commands
 from discord import app_commands, ui
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from datetime import datetime
 
 # --- 環境変数読み込み ---
@@ -27,18 +39,23 @@ else:
 # --- Google認証情報切り替え ---
 USE_RAILWAY = os.getenv("RAILWAY", "false").lower() == "true"
 
+# 認証情報は import 時に一度だけ読み込む（鍵の再読込・再パースをしない）
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
 if USE_RAILWAY:
     # Railwayの場合は環境変数にJSONを入れる
     CREDENTIALS_JSON = os.getenv("GOOGLE_CREDENTIALS_JSON")
     if not CREDENTIALS_JSON:
         raise RuntimeError("RAILWAY=true ですが、GOOGLE_CREDENTIALS_JSON が設定されていません。")
-    credentials = service_account.Credentials.from_service_account_info(json.loads(CREDENTIALS_JSON))
+    credentials = service_account.Credentials.from_service_account_info(
+        json.loads(CREDENTIALS_JSON), scopes=SHEETS_SCOPES)
 else:
     # ローカルの場合はファイルパスを使う
     CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
     if not CREDENTIALS_PATH or not os.path.exists(CREDENTIALS_PATH):
         raise RuntimeError("RAILWAY=false ですが、CREDENTIALS_PATH が存在しません。")
-    credentials = service_account.Credentials.from_service_account_file(CREDENTIALS_PATH)
+    credentials = service_account.Credentials.from_service_account_file(
+        CREDENTIALS_PATH, scopes=SHEETS_SCOPES)
 
 # --- GUILD ID の読み取り（テスト時は .env に GUILD_ID を入れてください） ---
 if GUILD_ID_ENV:
@@ -60,23 +77,34 @@ else:
 # 以前は maybe_guild_decorator を使っていましたが、デコレータの適用順による
 # 想定外の動作を避けるため廃止しました。
 
+# 前回同期したコマンド定義のハッシュ置き場。一致すれば tree.sync を省略する
+CMD_HASH_PATH = "cmdhash.txt"
+
+# BOT_DEBUG=1 のときだけ on_ready で詳細なデバッグ出力を行う
+BOT_DEBUG = os.getenv("BOT_DEBUG") == "1"
+
 # --- Discord Bot設定 ---
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
 # --- ユーティリティ関数 ---
+# 入力検証用（Sheets や DB に触る前に弾く）
+_HM_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+_DATE_RE = re.compile(r"^\d{4}/\d{2}/\d{2}$")
+
+def _hm(s: str) -> int:
+    """"HH:MM" を 0時からの分数に変換（strptime より大幅に軽い）"""
+    return int(s[0:2]) * 60 + int(s[3:5])
+
 def format_reservation_message(reservation: dict, prefix: str = "") -> str:
     """予約情報を表示用の文字列にフォーマット"""
-    msg = (
-        f"{prefix}\n"
-        f"👤 予約者：{reservation['user']}\n"
-        f"📅 予約日：{reservation['day']}\n"
-        f"🏠 場所：{reservation['channel']}\n"
-        f"🕒 時間：{reservation['start']}〜{reservation['end']}"
-    )
-    
-    return msg.strip()
+    parts = [prefix] if prefix else []
+    parts.append(f"👤 予約者：{reservation['user']}")
+    parts.append(f"📅 予約日：{reservation['day']}")
+    parts.append(f"🏠 場所：{reservation['channel']}")
+    parts.append(f"🕒 時間：{reservation['start']}〜{reservation['end']}")
+    return "\n".join(parts)
 
 def create_reservation_dict(row: list, row_index: int) -> dict:
     """スプレッドシートの行から予約情報の辞書を作成"""
@@ -97,41 +125,125 @@ class SheetOperations:
         self.service = None
         self.sheet_name = "sheet1"
         self.header = ["ユーザー名", "メニュー名", "日付", "開始", "終了", "ユーザーID", "タイムスタンプ"]
+        self._header_ensured = False
+        self._pending_header = False
+        # シート名に対応する数値 sheetId（初回利用時に一度だけ引く）
+        self._sheet_id = None
+        # get_values のキャッシュ。TTL 内の再読込（キャンセル経路など）を RAM で返す
+        self._cache = None
+        self._cache_ts = 0.0
+        self._ttl = 10.0
+        # キャッシュ行の列指向ビュー（ユーザー名・場所・日付の並行リスト）
+        self._users = self._channels = self._days = self._row_indices = None
+        self._columns_stale = True
 
     def get_service(self):
         """Sheets APIサービスを取得（初回のみ初期化）"""
         if not self.service:
-            self.service = build("sheets", "v4", credentials=credentials).spreadsheets()
+            # keep-alive な HTTP を 1 本使い回して毎回の TLS ハンドシェイクを省く。
+            # cache_discovery=False で oauth2client 向けファイルキャッシュ探索
+            # （と警告）を抑止する。認証情報は import 時に読み込んだものを使い回す
+            authed_http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=10))
+            # static_discovery=True でライブラリ同梱のディスカバリ文書を使い、
+            # 初回呼び出し時のネットワークフェッチを省く
+            self.service = build(
+                "sheets", "v4", http=authed_http,
+                cache_discovery=False, static_discovery=True
+            ).spreadsheets()
         return self.service
 
+    def _get_sheet_id(self) -> int:
+        """シート名に対応する数値 sheetId を取得（初回のみメタデータを読む）"""
+        if self._sheet_id is None:
+            service = self.get_service()
+            meta = service.get(
+                spreadsheetId=SPREADSHEET_ID,
+                fields="sheets(properties(sheetId,title))"
+            ).execute()
+            for sheet in meta.get("sheets", []):
+                props = sheet.get("properties", {})
+                if props.get("title", "").lower() == self.sheet_name.lower():
+                    self._sheet_id = props.get("sheetId", 0)
+                    break
+            else:
+                self._sheet_id = 0
+        return self._sheet_id
+
+    def ensure_header(self) -> None:
+        """ヘッダー行を一度だけ確認し、無ければ書き込む"""
+        if self._header_ensured:
+            return
+        service = self.get_service()
+        result = service.values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{self.sheet_name}!A1:G1",
+            fields="values"
+        ).execute()
+        rows = result.get("values", [])
+        if not rows or rows[0] != self.header:
+            # すぐには書かず、次の appendCells バッチに相乗りさせて 1 RPC に抑える
+            self._pending_header = True
+        self._header_ensured = True
+
     def get_values(self) -> list:
-        """シートの全データを取得"""
+        """シートの全データを取得（TTL 内はキャッシュを返す）"""
+        if self._cache is not None and monotonic() - self._cache_ts < self._ttl:
+            return self._cache
         service = self.get_service()
         result = service.values().get(
             spreadsheetId=SPREADSHEET_ID,
-            range=f"{self.sheet_name}!A:E"
+            range=f"{self.sheet_name}!A:E",
+            valueRenderOption="UNFORMATTED_VALUE",
+            dateTimeRenderOption="FORMATTED_STRING",
+            fields="values"
         ).execute()
-        return result.get("values", [])
+        self._cache = result.get("values", [])
+        self._cache_ts = monotonic()
+        self._columns_stale = True
+        return self._cache
 
     def append_row(self, values: list) -> None:
         """新しい行を追加"""
+        self.append_rows([values])
+
+    def append_rows(self, rows: list) -> None:
+        """複数行をまとめて 1 回の appendCells で追加（型は文字列で確定）"""
+        if self._pending_header:
+            rows = [self.header] + list(rows)
+            self._pending_header = False
         service = self.get_service()
-        service.values().append(
+        body = {
+            "requests": [{
+                "appendCells": {
+                    "sheetId": self._get_sheet_id(),
+                    "rows": [
+                        {"values": [
+                            {"userEnteredValue": {"stringValue": str(v)}}
+                            for v in row
+                        ]}
+                        for row in rows
+                    ],
+                    "fields": "userEnteredValue"
+                }
+            }]
+        }
+        service.batchUpdate(
             spreadsheetId=SPREADSHEET_ID,
-            range=f"{self.sheet_name}!A:E",
-            valueInputOption="USER_ENTERED",
-            body={"values": [values]}
+            body=body
         ).execute()
+        # キャッシュが温まっていれば作り直さず追記で同期する
+        if self._cache is not None:
+            self._cache.extend(list(r) for r in rows)
+            self._columns_stale = True
 
     def delete_row(self, row_index: int) -> None:
         """指定行を削除"""
-        # ここも get_service() を使う方が自然
-        service = build("sheets", "v4", credentials=credentials)
+        service = self.get_service()
         body = {
             "requests": [{
                 "deleteDimension": {
                     "range": {
-                        "sheetId": 0,
+                        "sheetId": self._get_sheet_id(),
                         "dimension": "ROWS",
                         "startIndex": row_index,
                         "endIndex": row_index + 1
@@ -139,34 +251,48 @@ class SheetOperations:
                 }
             }]
         }
-        service.spreadsheets().batchUpdate(
+        service.batchUpdate(
             spreadsheetId=SPREADSHEET_ID,
             body=body
         ).execute()
+        if self._cache is not None and 0 <= row_index < len(self._cache):
+            del self._cache[row_index]
+            self._columns_stale = True
+
+    def _rebuild_columns(self) -> None:
+        """キャッシュ行を列指向の並行リストに展開する（検索の内側ループ用）"""
+        users, channels, days, idxs = [], [], [], []
+        # 先頭はヘッダー行。存在は書き込み経路の ensure_header() が一度だけ保証する
+        for i, row in enumerate(self._cache[1:], 1):
+            if len(row) < 5:
+                continue
+            users.append(row[0])
+            channels.append(row[1])
+            days.append(row[2])
+            idxs.append(i)
+        self._users, self._channels, self._days = users, channels, days
+        self._row_indices = idxs
+        self._columns_stale = False
 
     def find_reservations(self, user: str = None, day: str = None, channel: str = None) -> list:
         """条件に一致する予約を検索"""
         rows = self.get_values()
         if not rows:
             return []
+        if self._columns_stale:
+            self._rebuild_columns()
 
-        # ヘッダー行を見て整形
-        if rows[0] != self.header:
-            self.append_row(self.header)
-            return []
-
+        users, channels, days = self._users, self._channels, self._days
         matches = []
-        for i, row in enumerate(rows[1:], 1):
-            if len(row) < 5:
-                continue
-            if user and row[0] != user:
+        for k in range(len(users)):
+            if user and users[k] != user:
                 continue
-            if day and row[2] != day:
+            if day and days[k] != day:
                 continue
-            if channel and row[1] != channel:
+            if channel and channels[k] != channel:
                 continue
-
-            matches.append(create_reservation_dict(row, i))
+            i = self._row_indices[k]
+            matches.append(create_reservation_dict(rows[i], i))
 
         return matches
 
@@ -174,9 +300,177 @@ class SheetOperations:
 # 最後にインスタンス化
 sheets = SheetOperations()
 
+# --- ローカル永続ストア（SQLite） ---
+# Sheets は 1 往復 100ms 超でクォータも厳しいため、照会はローカルの SQLite
+# （WAL モード）で即答し、Sheets へは後追いでミラーする
+DB_PATH = os.getenv("RESERVATIONS_DB", "reservations.db")
+
+class ReservationStore:
+    def __init__(self, path: str = DB_PATH):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reservations ("
+            " user TEXT, channel TEXT, day TEXT,"
+            " start_min INTEGER, end_min INTEGER,"
+            " start TEXT, end TEXT, user_name TEXT, timestamp TEXT)"
+        )
+        # 重複判定は必ず (場所, 日付) で絞ってから時間を見るので、複合索引を張る。
+        # start_min/end_min まで含めると重複判定が索引だけで完結する（covering index）
+        self.conn.execute("DROP INDEX IF EXISTS idx_slot")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_slot_span"
+            " ON reservations(channel, day, start_min, end_min)")
+        self._bootstrapped = False
+
+    def bootstrap_from_sheet(self) -> None:
+        """DB が空のときだけ Sheets の内容を一度取り込む"""
+        if self._bootstrapped:
+            return
+        if self.conn.execute("SELECT 1 FROM reservations LIMIT 1").fetchone() is None:
+            rows = []
+            for r in sheets.find_reservations():
+                try:
+                    span = (_hm(r["start"]), _hm(r["end"]))
+                except ValueError:
+                    continue
+                rows.append((r["user"], r["channel"], r["day"], span[0], span[1],
+                             r["start"], r["end"], r["user_name"], r["timestamp"]))
+            if rows:
+                self.conn.executemany(
+                    "INSERT INTO reservations VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        self._bootstrapped = True
+
+    def is_slot_available(self, channel: str, day: str, start: str, end: str) -> bool:
+        """指定した時間枠が既存予約と重ならないか（ローカル照会のみ）"""
+        hit = self.conn.execute(
+            "SELECT 1 FROM reservations"
+            " WHERE channel=? AND day=? AND start_min<? AND end_min>? LIMIT 1",
+            (channel, day, _hm(end), _hm(start))
+        ).fetchone()
+        return hit is None
+
+    def add(self, user, channel, day, start, end, user_name, timestamp) -> None:
+        """予約を正本へ登録する"""
+        self.conn.execute(
+            "INSERT INTO reservations VALUES (?,?,?,?,?,?,?,?,?)",
+            (user, channel, day, _hm(start), _hm(end), start, end, user_name, timestamp))
+
+    def remove(self, user, channel, day, start, end) -> None:
+        """一致する予約を 1 件だけ削除する"""
+        self.conn.execute(
+            "DELETE FROM reservations WHERE rowid IN ("
+            " SELECT rowid FROM reservations"
+            "  WHERE user=? AND channel=? AND day=? AND start=? AND end=? LIMIT 1)",
+            (user, channel, day, start, end))
+
+    def recent(self, limit: int = 10) -> list:
+        """末尾 limit 件の予約を古い順で返す"""
+        rows = self.conn.execute(
+            "SELECT user, channel, day, start, end FROM reservations"
+            " ORDER BY rowid DESC LIMIT ?", (limit,)).fetchall()
+        rows.reverse()
+        return [
+            {"user": u, "channel": c, "day": d, "start": s, "end": e}
+            for (u, c, d, s, e) in rows
+        ]
+
+store = ReservationStore()
+
+# httplib2.Http はスレッドセーフではないので、Sheets 呼び出しは専用の 1 スレッドに寄せる
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+async def _in_sheets_thread(fn, *args, **kwargs):
+    """Sheets の同期呼び出しを専用スレッドで実行する"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_SHEETS_EXECUTOR, partial(fn, *args, **kwargs))
+
+# クォータ超過（429）や一時的な 5xx で諦める前の最大試行回数
+SHEETS_MAX_ATTEMPTS = 5
+
+async def _sheets_call(fn, *args, **kwargs):
+    """Sheets 呼び出しを実行し、429/5xx は Retry-After を尊重して再試行する"""
+    for attempt in range(SHEETS_MAX_ATTEMPTS):
+        try:
+            return await _in_sheets_thread(fn, *args, **kwargs)
+        except HttpError as e:
+            status = getattr(e.resp, "status", None)
+            if status in (429, 500, 503) and attempt + 1 < SHEETS_MAX_ATTEMPTS:
+                # Retry-After があればそれに従い、無ければ指数バックオフ＋ジッタ
+                try:
+                    delay = float(e.resp.get("retry-after", 2 ** attempt))
+                except (TypeError, ValueError):
+                    delay = float(2 ** attempt)
+                await asyncio.sleep(delay + random.random())
+                continue
+            raise
+
+# --- 予約書き込みのバッチング ---
+APPEND_BATCH_MAX = 20
+APPEND_MAX_WAIT = 0.5  # 秒
+
+_append_queue = asyncio.Queue()
+_append_task = None
+
+async def _append_flusher():
+    """キューに溜まった予約行を 1 回の append にまとめて書き込む"""
+    while True:
+        row, done = await _append_queue.get()
+        rows = [row]
+        waiters = [done]
+        # 少しだけ待って、同時に来た予約を同じリクエストに相乗りさせる
+        deadline = monotonic() + APPEND_MAX_WAIT
+        while len(rows) < APPEND_BATCH_MAX:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row, done = await asyncio.wait_for(_append_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            rows.append(row)
+            waiters.append(done)
+
+        try:
+            await _sheets_call(sheets.ensure_header)
+            await _sheets_call(sheets.append_rows, rows)
+        except Exception as e:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+
+async def queue_append(row: list) -> None:
+    """予約行をキューに入れ、まとめ書き込みの完了を待つ"""
+    done = asyncio.get_running_loop().create_future()
+    await _append_queue.put((row, done))
+    await done
+
+# アクセストークンの先回り更新間隔（秒）。寿命 3600 秒より手前で更新する
+TOKEN_REFRESH_INTERVAL = 3000.0
+
+_token_refresh_task = None
+_views_registered = False
+
+async def _refresh_credentials_loop():
+    """アクセストークンを裏で更新し続け、利用者の操作に更新待ちを乗せない"""
+    from google.auth.transport.requests import Request
+    request = Request()
+    while True:
+        try:
+            await _in_sheets_thread(credentials.refresh, request)
+        except Exception as e:
+            print(f"⚠️ token refresh failed: {e}")
+        await asyncio.sleep(TOKEN_REFRESH_INTERVAL)
+
 
 # --- モーダル定義（予約用） ---
 class ReservationModal(ui.Modal, title="☕ 予約情報を入力してください"):
+    __slots__ = ("channel_name", "user_object", "user_name", "day", "start_time", "end_time")
+
     def __init__(self, channel_name: str, user: discord.User = None):
         super().__init__()
         self.channel_name = channel_name
@@ -192,28 +486,21 @@ class ReservationModal(ui.Modal, title="☕ 予約情報を入力してくださ
         self.add_item(self.start_time)
         self.add_item(self.end_time)
 
-    # --- 重複チェック（開始〜終了時間範囲） ---
-    def is_slot_available(self, day: str, start_time_str: str, end_time_str: str) -> bool:
-        """指定した時間枠が予約可能か確認"""
-        new_start = datetime.strptime(start_time_str, "%H:%M").time()
-        new_end = datetime.strptime(end_time_str, "%H:%M").time()
-
-        # チャンネルと日付で予約を検索
-        existing = sheets.find_reservations(day=day, channel=self.channel_name)
-        
-        for reservation in existing:
-            r_start = datetime.strptime(reservation["start"], "%H:%M").time()
-            r_end = datetime.strptime(reservation["end"], "%H:%M").time()
-
-            # 重複判定：範囲が少しでも重なる場合は False
-            if (new_start < r_end) and (new_end > r_start):
-                return False
-        return True
-
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=False)
-        # 時間範囲重複チェック
-        if not self.is_slot_available(self.day.value, self.start_time.value, self.end_time.value):
+        # 書式の崩れた入力は重複チェックより前に弾く
+        if not (_DATE_RE.match(self.day.value)
+                and _HM_RE.match(self.start_time.value)
+                and _HM_RE.match(self.end_time.value)):
+            await interaction.followup.send(
+                "❌ 日付・時間の書式が不正です。\n"
+                "日付は 2025/11/01、時間は 13:00 の形式（半角）で入力してください。",
+                ephemeral=True
+            )
+            return
+
+        # 時間範囲重複チェック（正本のローカル DB に即時照会）
+        if not store.is_slot_available(self.channel_name, self.day.value, self.start_time.value, self.end_time.value):
             await interaction.followup.send(
                 f"❌ {self.day.value} {self.start_time.value}〜{self.end_time.value} は既に予約があります。\n"
                 f"別の時間を選択してください。",
@@ -223,19 +510,30 @@ class ReservationModal(ui.Modal, title="☕ 予約情報を入力してくださ
 
         # 重複なしなら登録
         try:
-            # タイムスタンプを取得
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # タイムスタンプを取得（isoformat は C 実装で strftime より速い。出力は同一）
+            timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
             user_name = str(interaction.user.name)
             
-            sheets.append_row([
-                self.user_name.value,
-                self.channel_name,
-                self.day.value,
-                self.start_time.value,
-                self.end_time.value,
-                user_name,
-                timestamp
-            ])
+            # 先に正本へ登録し、Sheets へは後追いでミラーする
+            store.add(
+                self.user_name.value, self.channel_name, self.day.value,
+                self.start_time.value, self.end_time.value, user_name, timestamp
+            )
+            try:
+                await queue_append([
+                    self.user_name.value,
+                    self.channel_name,
+                    self.day.value,
+                    self.start_time.value,
+                    self.end_time.value,
+                    user_name,
+                    timestamp
+                ])
+            except Exception:
+                # ミラーに失敗した予約は正本にも残さない
+                store.remove(self.user_name.value, self.channel_name, self.day.value,
+                             self.start_time.value, self.end_time.value)
+                raise
 
             # 登録した予約情報を表示用にフォーマット
             reservation = {
@@ -258,6 +556,8 @@ class ReservationModal(ui.Modal, title="☕ 予約情報を入力してくださ
 
 # --- モーダル定義（キャンセル用） ---
 class CancelReservationModal(ui.Modal, title="☕ キャンセルしたい予約情報を入力してください"):
+    __slots__ = ("channel_name", "user_object", "user_name", "day", "start_time", "end_time")
+
     def __init__(self, channel_name: str, user: discord.User = None):
         super().__init__()
         self.channel_name = channel_name
@@ -276,8 +576,20 @@ class CancelReservationModal(ui.Modal, title="☕ キャンセルしたい予約
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=False)
 
+        # 書式の崩れた入力はシートを読む前に弾く（どのみち一致しない）
+        if not (_DATE_RE.match(self.day.value)
+                and _HM_RE.match(self.start_time.value)
+                and _HM_RE.match(self.end_time.value)):
+            await interaction.followup.send(
+                "❌ 日付・時間の書式が不正です。\n"
+                "日付は 2025/11/01、時間は 13:00 の形式（半角）で入力してください。",
+                ephemeral=True
+            )
+            return
+
         # 条件に一致する予約を探す
-        matches = sheets.find_reservations(
+        matches = await _sheets_call(
+            sheets.find_reservations,
             user=self.user_name.value,
             day=self.day.value,
             channel=self.channel_name
@@ -299,7 +611,9 @@ class CancelReservationModal(ui.Modal, title="☕ キャンセルしたい予約
         # 最初に見つかった予約をキャンセル
         reservation = matches[0]
         try:
-            sheets.delete_row(reservation["row_index"])
+            await _sheets_call(sheets.delete_row, reservation["row_index"])
+            store.remove(reservation["user"], reservation["channel"], reservation["day"],
+                         reservation["start"], reservation["end"])
             await interaction.followup.send(
                 format_reservation_message(reservation, prefix="✅ 予約をキャンセルしました！"),
                 ephemeral=False
@@ -311,23 +625,42 @@ class CancelReservationModal(ui.Modal, title="☕ キャンセルしたい予約
             )
 
 # --- プルダウンメニュー定義 ---
+# (カテゴリID, キャンセル用か) → SelectOption リスト。
+# 失効はチャンネル構成イベント側で行うので、呼び出し時の検査は不要
+_OPTIONS_CACHE = {}
+
+def _menu_options(category: discord.CategoryChannel, is_cancel: bool) -> list:
+    """カテゴリ内チャンネルの SelectOption 一覧（構成が変わらない限り再利用）"""
+    key = (category.id, is_cancel)
+    cached = _OPTIONS_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    # 説明文はチャンネル種別ごとに 2 種類しかないので、ループの外で組み立てる
+    action = "キャンセル" if is_cancel else "予約"
+    vdesc = f"ボイスチャンネル を{action}"
+    tdesc = f"テキストチャンネル を{action}"
+    options = []
+    for ch in category.channels:
+        if isinstance(ch, discord.VoiceChannel):
+            options.append(discord.SelectOption(label=ch.name, description=vdesc))
+        elif isinstance(ch, discord.TextChannel):
+            options.append(discord.SelectOption(label=ch.name, description=tdesc))
+    _OPTIONS_CACHE[key] = options
+    return options
+
 class MenuSelect(ui.Select):
-    def __init__(self, category_channels, is_cancel=False):
+    __slots__ = ("is_cancel",)
+
+    def __init__(self, options, is_cancel=False):
         self.is_cancel = is_cancel
-        action = "キャンセル" if is_cancel else "予約"
-        options = [
-            discord.SelectOption(
-                label=ch.name,
-                description=f"{'ボイスチャンネル' if isinstance(ch, discord.VoiceChannel) else 'テキストチャンネル'} を{action}"
-            )
-            for ch in category_channels
-            if isinstance(ch, (discord.TextChannel, discord.VoiceChannel))
-        ]
         super().__init__(
             placeholder=f"チャンネルを選択してください ☕",
             options=options,
             min_values=1,
-            max_values=1
+            max_values=1,
+            # 永続 View として復元できるよう固定の custom_id を持たせる
+            custom_id="cafe_menu_cancel" if is_cancel else "cafe_menu_reserve"
         )
 
     async def callback(self, interaction: discord.Interaction):
@@ -337,16 +670,50 @@ class MenuSelect(ui.Select):
 
 # --- View定義 ---
 class MenuSelectView(ui.View):
-    def __init__(self, category_channels, is_cancel=False):
-        super().__init__(timeout=60)
-        self.add_item(MenuSelect(category_channels, is_cancel))
+    __slots__ = ()
+
+    def __init__(self, category, is_cancel=False):
+        # timeout=None + 固定 custom_id で、再起動後も古いメッセージの
+        # メニューが反応する（60 秒で死ぬ使い捨て View をやめる）
+        super().__init__(timeout=None)
+        self.add_item(MenuSelect(_menu_options(category, is_cancel), is_cancel))
+
+# --- カフェカテゴリの解決 ---
+# ギルドID → 検証済みカフェカテゴリ。チャンネル構成イベントで破棄する
+_CATEGORY_CACHE = {}
+
+def get_cafe_category(guild: discord.Guild):
+    """カフェカテゴリを取得（検証済みのものをギルド単位で使い回す）"""
+    category = _CATEGORY_CACHE.get(guild.id)
+    if category is not None:
+        return category
+    category = guild.get_channel(CAFE_CATEGORY_ID)
+    if not isinstance(category, discord.CategoryChannel):
+        return None
+    _CATEGORY_CACHE[guild.id] = category
+    return category
+
+@bot.event
+async def on_guild_channel_create(channel):
+    _CATEGORY_CACHE.pop(channel.guild.id, None)
+    _OPTIONS_CACHE.clear()
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    _CATEGORY_CACHE.pop(after.guild.id, None)
+    _OPTIONS_CACHE.clear()
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    _CATEGORY_CACHE.pop(channel.guild.id, None)
+    _OPTIONS_CACHE.clear()
 
 # --- 予約フォームコマンド ---
 @bot.tree.command(name="reserve_form", description="ポップアップで予約を登録します")
 async def reserve_form(interaction: discord.Interaction):
-    category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
+    category = get_cafe_category(interaction.guild)
 
-    if not category or not isinstance(category, discord.CategoryChannel):
+    if not category:
         await interaction.response.send_message(
             f"❌ カテゴリーが見つかりません。(ID: {CAFE_CATEGORY_ID})\n"
             f"管理者に確認してください。",
@@ -354,7 +721,7 @@ async def reserve_form(interaction: discord.Interaction):
         )
         return
 
-    view = MenuSelectView(category.channels)
+    view = MenuSelectView(category)
     await interaction.response.send_message("☕ メニューを選んでください：", view=view, ephemeral=False)
 
 # --- 予約一覧コマンド ---
@@ -362,30 +729,34 @@ async def reserve_form(interaction: discord.Interaction):
 async def reserve_list(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
 
-    reservations = sheets.find_reservations()  # 全予約を取得
+    reservations = store.recent(10)  # ローカル DB から末尾10件
 
     if not reservations:
         await interaction.followup.send("📭 現在、予約はありません。", ephemeral=True)
         return
 
-    embed = discord.Embed(title="☕ 予約一覧（最新10件）", color=discord.Color.green())
-
-    # 最新の10件を表示
-    for reservation in reservations[-10:]:
-        embed.add_field(
-            name=f"📅 {reservation['day']} | {reservation['channel']}",
-            value=f"👤 {reservation['user']}\n🕒 {reservation['start']}〜{reservation['end']}",
-            inline=False
-        )
+    # add_field を繰り返すより from_dict で一括構築する方が安い
+    embed = discord.Embed.from_dict({
+        "title": "☕ 予約一覧（最新10件）",
+        "color": discord.Color.green().value,
+        "fields": [
+            {
+                "name": f"📅 {r['day']} | {r['channel']}",
+                "value": f"👤 {r['user']}\n🕒 {r['start']}〜{r['end']}",
+                "inline": False
+            }
+            for r in reservations
+        ]
+    })
 
     await interaction.followup.send(embed=embed, ephemeral=True)
 
 # --- 予約キャンセルコマンド ---
 @bot.tree.command(name="reserve_cancel", description="予約をキャンセルします")
 async def reserve_cancel(interaction: discord.Interaction):
-    category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
-    
-    if not category or not isinstance(category, discord.CategoryChannel):
+    category = get_cafe_category(interaction.guild)
+
+    if not category:
         await interaction.response.send_message(
             f"❌ カテゴリーが見つかりません。(ID: {CAFE_CATEGORY_ID})\n"
             f"管理者に確認してください。",
@@ -394,78 +765,130 @@ async def reserve_cancel(interaction: discord.Interaction):
         return
 
     # チャンネル選択ビューを表示
-    view = MenuSelectView(category.channels, is_cancel=True)
+    view = MenuSelectView(category, is_cancel=True)
     await interaction.response.send_message("☕ メニューを選んでください：", view=view, ephemeral=False)
 
 # --- Bot起動 ---
-@bot.event
-async def on_ready():
-    print(f"✅ Logged in as {bot.user}")
+async def _dump_command_debug():
+    """BOT_DEBUG=1 のときだけ呼ばれる起動時デバッグ出力"""
+    # デバッグ出力：bot.tree にロードされているコマンドの一覧を表示
     try:
-        # デバッグ出力：bot.tree にロードされているコマンドの一覧を表示
-        try:
-            global_cmds = [c.name for c in bot.tree.get_commands()]
-        except Exception:
-            global_cmds = []
-        try:
-            walk_cmds = [c.name for c in bot.tree.walk_commands()]
-        except Exception:
-            walk_cmds = []
-        print(f"🔎 debug: tree.get_commands() => {global_cmds}")
-        print(f"🔎 debug: tree.walk_commands() => {walk_cmds}")
+        global_cmds = [c.name for c in bot.tree.get_commands()]
+    except Exception:
+        global_cmds = []
+    try:
+        walk_cmds = [c.name for c in bot.tree.walk_commands()]
+    except Exception:
+        walk_cmds = []
+    print(f"🔎 debug: tree.get_commands() => {global_cmds}")
+    print(f"🔎 debug: tree.walk_commands() => {walk_cmds}")
 
-        # 追加デバッグ：application id / application info / bot user id
-        try:
-            print(f"🔎 debug: bot.user.id = {bot.user.id}")
-        except Exception:
-            print("🔎 debug: bot.user.id unavailable")
-        try:
-            print(f"🔎 debug: bot.application_id = {bot.application_id}")
-        except Exception:
-            print("🔎 debug: bot.application_id unavailable")
-        try:
-            app_info = await bot.application_info()
-            print(f"🔎 debug: application_info: id={getattr(app_info,'id',None)} name={getattr(app_info,'name',None)}")
-        except Exception as e:
-            print(f"🔎 debug: application_info fetch failed: {e}")
+    # 追加デバッグ：application id / application info / bot user id
+    try:
+        print(f"🔎 debug: bot.user.id = {bot.user.id}")
+    except Exception:
+        print("🔎 debug: bot.user.id unavailable")
+    try:
+        print(f"🔎 debug: bot.application_id = {bot.application_id}")
+    except Exception:
+        print("🔎 debug: bot.application_id unavailable")
+    try:
+        # application_info() は HTTP 呼び出しなのでデバッグ時のみ
+        app_info = await bot.application_info()
+        print(f"🔎 debug: application_info: id={getattr(app_info,'id',None)} name={getattr(app_info,'name',None)}")
+    except Exception as e:
+        print(f"🔎 debug: application_info fetch failed: {e}")
 
-        # 各コマンドの詳細（repr と属性）を表示
-        try:
-            for c in bot.tree.walk_commands():
-                try:
-                    attrs = {
-                        'name': getattr(c, 'name', None),
-                        'description': getattr(c, 'description', None),
-                        'guilds': getattr(c, 'guilds', None),
-                        'qualified_name': getattr(c, 'qualified_name', None)
-                    }
-                except Exception:
-                    attrs = {'name': getattr(c, 'name', None)}
-                print(f"🔎 debug: command object -> {c!r} attrs={attrs}")
-        except Exception as e:
-            print(f"🔎 debug: walk_commands failed: {e}")
+    # 各コマンドの詳細（repr と属性）を表示
+    try:
+        for c in bot.tree.walk_commands():
+            try:
+                attrs = {
+                    'name': getattr(c, 'name', None),
+                    'description': getattr(c, 'description', None),
+                    'guilds': getattr(c, 'guilds', None),
+                    'qualified_name': getattr(c, 'qualified_name', None)
+                }
+            except Exception:
+                attrs = {'name': getattr(c, 'name', None)}
+            print(f"🔎 debug: command object -> {c!r} attrs={attrs}")
+    except Exception as e:
+        print(f"🔎 debug: walk_commands failed: {e}")
 
+
+@bot.event
+async def on_ready():
+    print(f"✅ Logged in as {bot.user}")
+    global _append_task, _token_refresh_task, _views_registered
+    # 永続 View の登録（再起動前に送ったメニューも動くようにする）
+    if not _views_registered:
+        for guild in bot.guilds:
+            category = get_cafe_category(guild)
+            if category:
+                bot.add_view(MenuSelectView(category))
+                bot.add_view(MenuSelectView(category, is_cancel=True))
+                _views_registered = True
+                break
+    try:
+        # 初回起動時のみ Sheets から正本 DB を初期化する
+        await _sheets_call(store.bootstrap_from_sheet)
+    except Exception as e:
+        print(f"⚠️ failed to bootstrap local store: {e}")
+    if _append_task is None:
+        _append_task = asyncio.create_task(_append_flusher())
+    if _token_refresh_task is None:
+        _token_refresh_task = asyncio.create_task(_refresh_credentials_loop())
+    if BOT_DEBUG:
+        await _dump_command_debug()
+    try:
         # --- 開発用：ギルド同期で即時コマンド反映 ---
         if GUILD_OBJ:
-            # Explicitly ensure each command is added to the guild mapping before syncing.
-            added = []
+            # コマンド定義が前回同期時から変わっていなければ、ギルドマッピングへの
+            # 再登録も HTTP 同期もまとめて省略する（再接続のたびに走る処理なので）
+            payload = []
             for c in bot.tree.walk_commands():
                 try:
-                    # add_command(command, guild=...) will copy the command into the guild-specific mapping
-                    bot.tree.add_command(c, guild=GUILD_OBJ)
-                    added.append(getattr(c, 'name', repr(c)))
-                except Exception as e:
-                    print(f"⚠️ failed to add command {getattr(c,'name',repr(c))} to guild mapping: {e}")
-
-            print(f"🔁 debug: attempted to add commands to guild mapping => {added}")
-            synced = await bot.tree.sync(guild=GUILD_OBJ)
-            print(f"🔁 Slash commands synced to guild ({len(synced)} commands)")
-            # 起動後に現在登録されているコマンド一覧を確認
+                    payload.append(c.to_dict(bot.tree))
+                except TypeError:
+                    # discord.py 2.3 以前の to_dict は引数なし
+                    payload.append(c.to_dict())
+            cmd_hash = hashlib.sha256(
+                json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()
+            ).hexdigest()
             try:
-                guild_cmds = bot.tree.get_commands(guild=GUILD_OBJ)
-            except Exception:
-                guild_cmds = []
-            print(f"🔁 guild commands after sync: {guild_cmds}")
+                with open(CMD_HASH_PATH) as f:
+                    last_hash = f.read().strip()
+            except OSError:
+                last_hash = None
+
+            if cmd_hash == last_hash:
+                print("🔁 Slash commands unchanged, sync skipped")
+            else:
+                # Explicitly ensure each command is added to the guild mapping before syncing.
+                added = []
+                for c in bot.tree.walk_commands():
+                    try:
+                        # add_command(command, guild=...) will copy the command into the guild-specific mapping
+                        bot.tree.add_command(c, guild=GUILD_OBJ)
+                        added.append(getattr(c, 'name', repr(c)))
+                    except Exception as e:
+                        print(f"⚠️ failed to add command {getattr(c,'name',repr(c))} to guild mapping: {e}")
+                if BOT_DEBUG:
+                    print(f"🔁 debug: attempted to add commands to guild mapping => {added}")
+
+                synced = await bot.tree.sync(guild=GUILD_OBJ)
+                print(f"🔁 Slash commands synced to guild ({len(synced)} commands)")
+                try:
+                    with open(CMD_HASH_PATH, "w") as f:
+                        f.write(cmd_hash)
+                except OSError as e:
+                    print(f"⚠️ failed to save command hash: {e}")
+                # 起動後に現在登録されているコマンド一覧を確認
+                try:
+                    guild_cmds = bot.tree.get_commands(guild=GUILD_OBJ)
+                except Exception:
+                    guild_cmds = []
+                print(f"🔁 guild commands after sync: {guild_cmds}")
         else:
             print("⚠️ GUILD_ID が設定されていません。ギルド同期はスキップされます。開発時は .env に GUILD_ID を設定してください。")
 
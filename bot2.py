@@ -4,12 +4,21 @@
 # 2. header チェックを安全化（既にデータがある時に2重追加を防ぐ）
 # 3. category ID の扱いを一本化
 
+import asyncio
 import os
+from bisect import insort
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import discord
-from discord.ext import commands
+import httplib2
+from discord.ext import commands, tasks
 from discord import app_commands, ui
 from dotenv import load_dotenv
+from time import monotonic
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from datetime import datetime
 
@@ -23,66 +32,182 @@ CAFE_CATEGORY_ID = int(os.getenv("CAFE_CATEGORY_ID_TEST", "0"))
 guild_id_env = os.getenv("GUILD_ID_TEST")
 GUILD_OBJ = discord.Object(id=int(guild_id_env)) if guild_id_env else None
 
+# 認証情報は import 時に一度だけ読み込む（鍵ファイルの再読込・再パースをしない）
+CREDS = service_account.Credentials.from_service_account_file(
+    CREDENTIALS_PATH,
+    scopes=["https://www.googleapis.com/auth/spreadsheets"]
+)
+
 # --- Discord Bot 設定 ---
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
 # --- Google Sheet 操作 ---
+def _hm(s: str) -> int:
+    """"HH:MM" を 0時からの分数に変換（strptime より大幅に軽い）"""
+    return int(s[0:2]) * 60 + int(s[3:5])
+
+def parse_hm(s: str) -> int:
+    """ユーザー入力向けの _hm。形式が崩れていれば ValueError を投げる"""
+    if len(s) != 5 or s[2] != ":":
+        raise ValueError(s)
+    return _hm(s)
+
+# 行ごとの dict 構築より軽い読み取り結果の入れ物
+Reservation = namedtuple("Reservation", "row_index user channel day start end")
+
+# Sheets API の同時呼び出し数の上限（ユーザー毎 QPS 制限を守る）
+_SHEETS_SEM = asyncio.Semaphore(5)
+
+# httplib2.Http はスレッドセーフではないので、Sheets 呼び出しは専用の 1 スレッドに寄せる
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+async def _in_sheets_thread(fn, *args, **kwargs):
+    """Sheets の同期呼び出しを専用スレッドで実行する"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_SHEETS_EXECUTOR, partial(fn, *args, **kwargs))
+
 class SheetOperations:
     def __init__(self):
         self.service = None
+        self._values = None
         self.sheet_name = "sheet1"
         self.header = ["ユーザー名", "メニュー名", "日付", "開始", "終了"]
+        # ヘッダー行の検査は起動時の 1 回だけにする
+        self._header_verified = False
+        self._header_pad = False
+        # シート上の行数（ヘッダー込み）。末尾読みの範囲指定に使う
+        self._row_count = None
+        # シート全体の TTL キャッシュ（読み取りを毎回ネットワークに出さない）
+        self._cache = None
+        self._cache_ts = 0.0
+        self._ttl = 30.0
+        # (チャンネル, 日付) → [(開始分, 終了分), ...] の索引。空き確認を同日分だけの走査にする
+        self._index = {}
+        # 列ごとの並行配列（SoA）。複数条件の絞り込みを行リストの添字アクセスなしで回す
+        self._users = []
+        self._channels = []
+        self._days = []
+        self._starts = []
+        self._ends = []
+        # (日付, チャンネル) ごとの予約直列化ロック（確認〜追記の TOCTOU 対策）
+        self._locks = defaultdict(asyncio.Lock)
+        # フラッシュ待ちの書き込み。同じ周期に来た書き込みを 1 RPC に相乗りさせる
+        self._pending_appends = []
+        self._pending_deletes = []
 
     def get_service(self):
         if not self.service:
-            creds = service_account.Credentials.from_service_account_file(
-                CREDENTIALS_PATH,
-                scopes=["https://www.googleapis.com/auth/spreadsheets"]
-            )
-            self.service = build("sheets", "v4", credentials=creds).spreadsheets()
+            # keep-alive な HTTP を 1 本使い回して毎回の TLS ハンドシェイクを省く
+            authed_http = AuthorizedHttp(CREDS, http=httplib2.Http(timeout=10))
+            # static_discovery=True で同梱のディスカバリ文書を使い、
+            # 起動時のネットワークフェッチとファイルキャッシュ探索を両方省く
+            self.service = build(
+                "sheets", "v4",
+                http=authed_http,
+                cache_discovery=False,
+                static_discovery=True,
+            ).spreadsheets()
+            # values() リソースも毎回作り直さず使い回す（読み書きのホットパス向け）
+            self._values = self.service.values()
         return self.service
 
-    def get_values(self):
-        service = self.get_service()
-        result = service.values().get(
+    def get_values_resource(self):
+        self.get_service()
+        return self._values
+
+    def ensure_header(self):
+        """ヘッダー行の確認を 1 回だけ行う（毎回の比較と先頭挿入をやめる）
+
+        空シートにはヘッダーを追記する。既存データの先頭がヘッダーでない
+        場合は、行番号が従来どおり揃うよう読み取り時の先頭挿入だけ続ける。
+        """
+        if self._header_verified:
+            return
+        result = self.get_values_resource().get(
             spreadsheetId=SPREADSHEET_ID,
-            range=f"{self.sheet_name}!A:E"
+            range=f"{self.sheet_name}!A1:E1",
+            fields="values"
         ).execute()
-
         rows = result.get("values", [])
-
-        # --- 修正: ヘッダー強制追加ではなく、「無ければ追加」に変更 ---
         if not rows:
             self.append_row(self.header)
-            return []
-        if rows[0] != self.header:
+        elif rows[0] != self.header:
+            self._header_pad = True
+        self._header_verified = True
+
+    def get_values(self, force=False):
+        # TTL 内はキャッシュを返す。書き込み側はキャッシュを直接更新するので、
+        # 通常の読み取りがネットワークに出るのは TTL 失効時だけになる
+        if not force and self._cache is not None and monotonic() - self._cache_ts < self._ttl:
+            return self._cache
+
+        self.ensure_header()
+        result = self.get_values_resource().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{self.sheet_name}!A:E",
+            fields="values"
+        ).execute()
+
+        rows = result.get("values", [])
+        # 末尾セルが空の行は短く返ってくるので、取り込み時に一度だけ 5 列へ揃える。
+        # 以降の走査は長さ分岐なしで添字アクセスできる
+        for i, row in enumerate(rows):
+            if len(row) < 5:
+                rows[i] = row + [""] * (5 - len(row))
+        if self._header_pad:
             rows.insert(0, self.header)
+        self._row_count = len(rows)
+        self._cache = rows
+        self._cache_ts = monotonic()
+        self._rebuild_index()
         return rows
 
     def append_row(self, values):
-        service = self.get_service()
-        service.values().append(
+        self.append_rows([values])
+
+    def append_rows(self, rows):
+        self.get_values_resource().append(
             spreadsheetId=SPREADSHEET_ID,
             range=f"{self.sheet_name}!A:E",
             valueInputOption="USER_ENTERED",
-            body={"values": [values]}
+            body={"values": rows},
+            fields="spreadsheetId"
         ).execute()
+        if self._row_count is not None:
+            self._row_count += len(rows)
+        # 再取得せずキャッシュへ直接反映する（書き込み直後の読み取りも一貫する）
+        if self._cache is not None:
+            self._cache.extend(list(r) for r in rows)
+            # 追記は全再構築せず、列配列へ積んで該当バケットへソート挿入するだけでよい
+            for row in rows:
+                if len(row) < 5:
+                    continue
+                self._users.append(row[0])
+                self._channels.append(row[1])
+                self._days.append(row[2])
+                self._starts.append(row[3])
+                self._ends.append(row[4])
+                try:
+                    span = (_hm(row[3]), _hm(row[4]))
+                except (ValueError, IndexError):
+                    continue
+                insort(self._index.setdefault((row[1], row[2]), []), span)
 
     def delete_row(self, row_index_sheet):
+        self.delete_rows([row_index_sheet])
+
+    def delete_rows(self, row_indices):
         """
-        row_index_sheet は 1-index（A2 = 1）で渡される。
+        row_indices は 1-index（A2 = 1）で渡される。
         Google Sheets API は 0-index なので変換する。
+        複数行は後ろから消すことで、同一リクエスト内の行ズレを避ける。
         """
-        start = row_index_sheet
-        end = row_index_sheet + 1
+        ordered = sorted(row_indices, reverse=True)
 
-        creds = service_account.Credentials.from_service_account_file(
-            CREDENTIALS_PATH,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"]
-        )
-        service = build("sheets", "v4", credentials=creds)
+        # append_row と同じく使い回しのサービスを使う（鍵の再読込・再構築をしない）
+        service = self.get_service()
 
         body = {
             "requests": [
@@ -91,88 +216,273 @@ class SheetOperations:
                         "range": {
                             "sheetId": 0,
                             "dimension": "ROWS",
-                            "startIndex": start,
-                            "endIndex": end
+                            "startIndex": i,
+                            "endIndex": i + 1
                         }
                     }
                 }
+                for i in ordered
             ]
         }
-        service.spreadsheets().batchUpdate(
+        service.batchUpdate(
             spreadsheetId=SPREADSHEET_ID,
             body=body
         ).execute()
+        if self._row_count is not None:
+            self._row_count -= len(ordered)
+        if self._cache is not None:
+            for i in ordered:
+                if i < len(self._cache):
+                    del self._cache[i]
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        """キャッシュから (チャンネル, 日付) 索引と列配列を作り直す（メモリ内なので安価）"""
+        index = {}
+        users, channels, days, starts, ends = [], [], [], [], []
+        for row in self._cache[1:]:
+            # 列配列は行番号を揃えるため、時刻が壊れた行も含めて積む
+            users.append(row[0])
+            channels.append(row[1])
+            days.append(row[2])
+            starts.append(row[3])
+            ends.append(row[4])
+            try:
+                span = (_hm(row[3]), _hm(row[4]))
+            except (ValueError, IndexError):
+                continue
+            index.setdefault((row[1], row[2]), []).append(span)
+        # 開始時刻順に保つと、空き確認が途中で打ち切れる
+        for bucket in index.values():
+            bucket.sort()
+        self._index = index
+        self._users = users
+        self._channels = channels
+        self._days = days
+        self._starts = starts
+        self._ends = ends
+
+    def get_columns(self, cols):
+        """必要な列だけを batchGet で取得する（A:E 全列のダウンロードを避ける）"""
+        result = self.get_values_resource().batchGet(
+            spreadsheetId=SPREADSHEET_ID,
+            ranges=[f"{self.sheet_name}!{c}:{c}" for c in cols],
+            majorDimension="COLUMNS",
+            fields="valueRanges(values)"
+        ).execute()
+        out = []
+        for vr in result.get("valueRanges", []):
+            vals = vr.get("values", [])
+            out.append(vals[0] if vals else [])
+        return out
 
-    def find_reservations(self, user=None, day=None, channel=None):
-        rows = self.get_values()
-        if len(rows) <= 1:
-            return []
+    def slot_times(self, day, channel):
+        """空き確認専用の軽量版。(開始分, 終了分) の組だけを返す。
 
+        キャッシュが生きていれば索引から同日・同チャンネル分だけを引き、
+        無ければユーザー名列を除いた B〜E 列だけを取得して payload を最小にする。
+        """
+        if self._cache is not None and monotonic() - self._cache_ts < self._ttl:
+            return self._index.get((channel, day), [])
+        chans, days, starts, ends = self.get_columns(["B", "C", "D", "E"])
+        n = min(len(chans), len(days), len(starts), len(ends))
+        out = []
+        for i in range(1, n):
+            if chans[i] != channel or days[i] != day:
+                continue
+            try:
+                out.append((_hm(starts[i]), _hm(ends[i])))
+            except (ValueError, IndexError):
+                continue
+        out.sort()
+        return out
+
+    def find_recent(self, limit=10):
+        """末尾 limit 件の予約だけを取得（行数が既知なら範囲を絞って読む）"""
+        # キャッシュが生きていれば末尾をメモリから切り出すだけで済む
+        if self._cache is not None and monotonic() - self._cache_ts < self._ttl:
+            matches = []
+            for i in range(max(1, len(self._cache) - limit), len(self._cache)):
+                row = self._cache[i]
+                if not row[4]:
+                    continue
+                matches.append(Reservation(i, row[0], row[1], row[2], row[3], row[4]))
+            return matches
+        if self._row_count is None or self._row_count <= 1:
+            return self.find_reservations()[-limit:]
+        first = max(2, self._row_count - limit + 1)
+        result = self.get_values_resource().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{self.sheet_name}!A{first}:E{self._row_count}",
+            fields="values"
+        ).execute()
         matches = []
-        for i, row in enumerate(rows[1:], 1):  # 1-index
+        for i, row in enumerate(result.get("values", [])):
             if len(row) < 5:
                 continue
-            if user and row[0] != user:
+            matches.append(Reservation(first - 1 + i, row[0], row[1], row[2], row[3], row[4]))
+        return matches
+
+    def find_reservations(self, user=None, day=None, channel=None):
+        self.get_values()  # キャッシュと列配列を最新にする
+        users, channels, days = self._users, self._channels, self._days
+        starts, ends = self._starts, self._ends
+
+        matches = []
+        for i in range(len(users)):
+            if not ends[i]:  # 取り込み時に 5 列へ揃えてあるので、空チェックだけでよい
                 continue
-            if day and row[2] != day:
+            if user and users[i] != user:
                 continue
-            if channel and row[1] != channel:
+            if day and days[i] != day:
                 continue
-            matches.append({
-                "row_index": i,
-                "user": row[0],
-                "channel": row[1],
-                "day": row[2],
-                "start": row[3],
-                "end": row[4]
-            })
+            if channel and channels[i] != channel:
+                continue
+            matches.append(Reservation(i + 1, users[i], channels[i], days[i], starts[i], ends[i]))
         return matches
 
+    # --- async ラッパー（イベントループを塞がずに実行する） ---
+    async def aget_values(self, force=False):
+        async with _SHEETS_SEM:
+            return await _in_sheets_thread(self.get_values, force=force)
+
+    async def aappend_row(self, values):
+        # 直接書かずにキューへ積み、バッチフラッシュの完了を待つ
+        fut = asyncio.get_running_loop().create_future()
+        self._pending_appends.append((values, fut))
+        await fut
+
+    async def adelete_row(self, row_index_sheet):
+        fut = asyncio.get_running_loop().create_future()
+        self._pending_deletes.append((row_index_sheet, fut))
+        await fut
+
+    async def _flush_writes(self):
+        """溜まった追記・削除をそれぞれ 1 回の API 呼び出しにまとめて実行する"""
+        if self._pending_appends:
+            batch, self._pending_appends = self._pending_appends, []
+            rows = [r for r, _ in batch]
+            try:
+                async with _SHEETS_SEM:
+                    await _in_sheets_thread(self.append_rows, rows)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+        if self._pending_deletes:
+            batch, self._pending_deletes = self._pending_deletes, []
+            indices = [i for i, _ in batch]
+            try:
+                async with _SHEETS_SEM:
+                    await _in_sheets_thread(self.delete_rows, indices)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+    async def afind_reservations(self, user=None, day=None, channel=None):
+        async with _SHEETS_SEM:
+            return await _in_sheets_thread(
+                self.find_reservations, user=user, day=day, channel=channel)
+
+    async def aslot_times(self, day, channel):
+        async with _SHEETS_SEM:
+            return await _in_sheets_thread(self.slot_times, day, channel)
+
+    async def afind_recent(self, limit=10):
+        async with _SHEETS_SEM:
+            return await _in_sheets_thread(self.find_recent, limit)
+
 sheets = SheetOperations()
 
+@tasks.loop(seconds=0.25)
+async def _write_flusher():
+    """短い周期でキューを掃き、同時に来た書き込みを同じリクエストに載せる"""
+    await sheets._flush_writes()
+
+@tasks.loop(seconds=30)
+async def _cache_warmer():
+    """TTL と同じ周期でキャッシュを裏で温め直し、失効をユーザー操作に踏ませない"""
+    try:
+        await sheets.aget_values(force=True)
+    except Exception as e:
+        print(f"⚠️ Cache refresh failed: {e}")
+
 # --- モーダル（予約） ---
 class ReservationModal(ui.Modal, title="☕ 予約情報を入力してください"):
+    __slots__ = ("channel_name", "user_name", "day", "start_time", "end_time")
+
+    # (属性名, ラベル, プレースホルダ) の仕様はクラスに一度だけ持つ
+    _INPUT_SPECS = (
+        ("user_name", "予約者名", None),
+        ("day", "予約日", "例: 2025/11/01"),
+        ("start_time", "開始時間", "例: 13:00"),
+        ("end_time", "終了時間", "例: 14:00"),
+    )
+
     def __init__(self, channel_name: str):
         super().__init__()
         self.channel_name = channel_name
-
-        self.user_name = ui.TextInput(label="予約者名")
-        self.day = ui.TextInput(label="予約日", placeholder="例: 2025/11/01")
-        self.start_time = ui.TextInput(label="開始時間", placeholder="例: 13:00")
-        self.end_time = ui.TextInput(label="終了時間", placeholder="例: 14:00")
-
-        self.add_item(self.user_name)
-        self.add_item(self.day)
-        self.add_item(self.start_time)
-        self.add_item(self.end_time)
-
-    def is_slot_available(self, day: str, start: str, end: str):
-        new_start = datetime.strptime(start, "%H:%M").time()
-        new_end = datetime.strptime(end, "%H:%M").time()
-
-        existing = sheets.find_reservations(day=day, channel=self.channel_name)
-        for r in existing:
-            r_start = datetime.strptime(r["start"], "%H:%M").time()
-            r_end = datetime.strptime(r["end"], "%H:%M").time()
-            if (new_start < r_end) and (new_end > r_start):
+        # discord.py の都合で TextInput 自体は毎回作る必要がある
+        for attr, label, placeholder in self._INPUT_SPECS:
+            item = ui.TextInput(label=label, placeholder=placeholder)
+            setattr(self, attr, item)
+            self.add_item(item)
+
+    async def is_slot_available(self, day: str, start: str, end: str):
+        new_start = _hm(start)
+        new_end = _hm(end)
+
+        # 開始時刻順に並んでいるので、新規枠より後ろに達したら残りは見なくてよい
+        existing = await sheets.aslot_times(day, self.channel_name)
+        for s, e in existing:
+            if s >= new_end:
+                break
+            if e > new_start:
                 return False
         return True
 
     async def on_submit(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
-
-        if not self.is_slot_available(self.day.value, self.start_time.value, self.end_time.value):
-            await interaction.followup.send("❌ この時間帯はすでに予約があります。", ephemeral=True)
+        # defer の往復は Sheets 読みと独立なので、裏で走らせて空き確認と重ねる
+        defer_task = asyncio.create_task(interaction.response.defer(ephemeral=True))
+
+        # 形式が崩れた入力はシートへ問い合わせる前に弾く
+        try:
+            parse_hm(self.start_time.value)
+            parse_hm(self.end_time.value)
+        except ValueError:
+            await defer_task
+            await interaction.followup.send("❌ 時間は HH:MM 形式で入力してください。", ephemeral=True)
             return
 
-        # 登録
-        sheets.append_row([
-            self.user_name.value,
-            self.channel_name,
-            self.day.value,
-            self.start_time.value,
-            self.end_time.value
-        ])
+        # 空き確認から追記までの間に別の予約が割り込むと二重確保になるので、
+        # 同じ (日付, チャンネル) の予約はロックで直列化する。別枠の予約は並行のまま
+        async with sheets._locks[(self.day.value, self.channel_name)]:
+            available, _ = await asyncio.gather(
+                self.is_slot_available(self.day.value, self.start_time.value, self.end_time.value),
+                defer_task,
+            )
+            if not available:
+                await interaction.followup.send("❌ この時間帯はすでに予約があります。", ephemeral=True)
+                return
+
+            # 登録
+            await sheets.aappend_row([
+                self.user_name.value,
+                self.channel_name,
+                self.day.value,
+                self.start_time.value,
+                self.end_time.value
+            ])
 
         await interaction.followup.send(
             f"✅ 予約を登録しました！"
@@ -184,56 +494,104 @@ class ReservationModal(ui.Modal, title="☕ 予約情報を入力してくださ
 
 # --- モーダル（キャンセル） ---
 class CancelReservationModal(ui.Modal, title="☕ 予約をキャンセルします"):
+    __slots__ = ("channel_name", "user_name", "day", "start_time", "end_time")
+
+    _INPUT_SPECS = ReservationModal._INPUT_SPECS
+
     def __init__(self, channel_name: str):
         super().__init__()
         self.channel_name = channel_name
-
-        self.user_name = ui.TextInput(label="予約者名")
-        self.day = ui.TextInput(label="予約日", placeholder="例: 2025/11/01")
-        self.start_time = ui.TextInput(label="開始時間", placeholder="例: 13:00")
-        self.end_time = ui.TextInput(label="終了時間", placeholder="例: 14:00")
-
-        self.add_item(self.user_name)
-        self.add_item(self.day)
-        self.add_item(self.start_time)
-        self.add_item(self.end_time)
+        for attr, label, placeholder in self._INPUT_SPECS:
+            item = ui.TextInput(label=label, placeholder=placeholder)
+            setattr(self, attr, item)
+            self.add_item(item)
 
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        matches = sheets.find_reservations(
+        # 形式が崩れた入力はどの予約とも一致しないので、検索前に弾く
+        try:
+            parse_hm(self.start_time.value)
+            parse_hm(self.end_time.value)
+        except ValueError:
+            await interaction.followup.send("❌ 時間は HH:MM 形式で入力してください。", ephemeral=True)
+            return
+
+        matches = await sheets.afind_reservations(
             user=self.user_name.value,
             day=self.day.value,
             channel=self.channel_name
         )
 
-        matches = [r for r in matches if r["start"] == self.start_time.value and r["end"] == self.end_time.value]
+        matches = [r for r in matches if r.start == self.start_time.value and r.end == self.end_time.value]
 
         if not matches:
             await interaction.followup.send("❌ 一致する予約が見つかりませんでした。", ephemeral=True)
             return
 
         target = matches[0]
-        sheets.delete_row(target["row_index"])
+        await sheets.adelete_row(target.row_index)
 
         await interaction.followup.send(
             f"✅ 予約をキャンセルしました！"
-            f"👤 {target['user']}📅 {target['day']}"
-            f"🏠 {target['channel']}🕒 {target['start']}〜{target['end']}",
+            f"👤 {target.user}📅 {target.day}"
+            f"🏠 {target.channel}🕒 {target.start}〜{target.end}",
             ephemeral=True
         )
 
 
 # --- プルダウンメニュー ---
+# カテゴリの解決結果も使い回す（対話のたびにギルドから引き直さない）
+_CAFE_CATEGORY = None
+
+def get_cafe_category(guild):
+    global _CAFE_CATEGORY
+    if _CAFE_CATEGORY is None:
+        _CAFE_CATEGORY = guild.get_channel(CAFE_CATEGORY_ID)
+    return _CAFE_CATEGORY
+
+# SelectOption はボタンが押されるたびに作り直さず、チャンネル構成が変わった時だけ作り直す
+_CAFE_OPTIONS = None
+
+def get_cafe_options(category):
+    global _CAFE_OPTIONS
+    if _CAFE_OPTIONS is None:
+        _CAFE_OPTIONS = [
+            discord.SelectOption(label=ch.name, value=str(ch.id))
+            for ch in category.channels
+            if not isinstance(ch, discord.CategoryChannel)
+        ]
+    return _CAFE_OPTIONS
+
+def _invalidate_cafe_options(channel):
+    """カフェカテゴリ本体・配下のチャンネルが変わった時だけキャッシュを捨てる"""
+    global _CAFE_CATEGORY, _CAFE_OPTIONS
+    if channel.id == CAFE_CATEGORY_ID:
+        _CAFE_CATEGORY = None
+        _CAFE_OPTIONS = None
+    elif getattr(channel, "category_id", None) == CAFE_CATEGORY_ID:
+        _CAFE_OPTIONS = None
+
+@bot.event
+async def on_guild_channel_create(channel):
+    _invalidate_cafe_options(channel)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    _invalidate_cafe_options(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    _invalidate_cafe_options(before)
+    _invalidate_cafe_options(after)
+
 class MenuSelect(ui.Select):
-    def __init__(self, category_channels, is_cancel=False):
-        self.is_cancel = is_cancel
-        options = []
-        for ch in category_channels:
-            if isinstance(ch, discord.CategoryChannel):
-                continue
-            options.append(discord.SelectOption(label=ch.name, value=str(ch.id)))
+    __slots__ = ("is_cancel", "_name_by_id")
 
+    def __init__(self, options, is_cancel=False):
+        self.is_cancel = is_cancel
+        # label がチャンネル名、value が ID なので、ギルド検索なしで引ける対応表を持つ
+        self._name_by_id = {o.value: o.label for o in options}
         super().__init__(
             placeholder="チャンネルを選択してください",
             options=options,
@@ -242,16 +600,31 @@ class MenuSelect(ui.Select):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        channel_id = int(self.values[0])
-        channel = interaction.guild.get_channel(channel_id)
-        modal = CancelReservationModal(channel.name) if self.is_cancel else ReservationModal(channel.name)
+        name = self._name_by_id[self.values[0]]
+        modal = CancelReservationModal(name) if self.is_cancel else ReservationModal(name)
         await interaction.response.send_modal(modal)
 
 
 class MenuSelectView(ui.View):
-    def __init__(self, category_channels, is_cancel=False):
+    __slots__ = ()
+
+    def __init__(self, options, is_cancel=False):
         super().__init__(timeout=60)
-        self.add_item(MenuSelect(category_channels, is_cancel))
+        self.add_item(MenuSelect(options, is_cancel))
+
+
+async def _send_menu(interaction: discord.Interaction, is_cancel=False,
+                     message="メニューを選択してください"):
+    """カテゴリ解決〜エラー応答〜メニュー送信を 1 箇所に集約する"""
+    category = get_cafe_category(interaction.guild)
+    if not category:
+        await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
+        return
+    await interaction.response.send_message(
+        message,
+        view=MenuSelectView(get_cafe_options(category), is_cancel=is_cancel),
+        ephemeral=True
+    )
 
 
 # --- ボタンメニュー ---
@@ -261,72 +634,46 @@ class ReservationMenu(ui.View):
 
     @ui.button(label="📝 予約する", style=discord.ButtonStyle.primary)
     async def reserve_btn(self, interaction: discord.Interaction, button: ui.Button):
-        category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
-        if not category:
-            await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
-            return
-        await interaction.response.send_message(
-            "メニューを選択してください",
-            view=MenuSelectView(category.channels),
-            ephemeral=True
-        )
+        await _send_menu(interaction)
 
     @ui.button(label="❌ キャンセル", style=discord.ButtonStyle.danger)
     async def cancel_btn(self, interaction: discord.Interaction, button: ui.Button):
-        category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
-        if not category:
-            await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
-            return
-        await interaction.response.send_message(
-            "キャンセルするメニューを選択",
-            view=MenuSelectView(category.channels, is_cancel=True),
-            ephemeral=True
-        )
+        await _send_menu(interaction, is_cancel=True, message="キャンセルするメニューを選択")
+
+
+# 永続 View は 1 個だけ作って使い回す（トリガーごとの再構築をしない）
+_RESERVE_VIEW = ReservationMenu()
 
 
 # --- Slash Commands ---
 @bot.tree.command(name="reserve_form", description="予約フォームを表示します")
 async def reserve_form(interaction: discord.Interaction):
-    category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
-    if not category:
-        await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
-        return
-    await interaction.response.send_message(
-        "メニューを選択してください",
-        view=MenuSelectView(category.channels),
-        ephemeral=True
-    )
+    await _send_menu(interaction)
 
 
 @bot.tree.command(name="reserve_list", description="予約一覧を表示します")
 async def reserve_list(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    reservations = sheets.find_reservations()
+    reservations = await sheets.afind_recent(10)
     if not reservations:
         await interaction.followup.send("📭 現在予約はありません。", ephemeral=True)
         return
 
-    embed = discord.Embed(title="☕ 予約一覧（最新10件）", color=discord.Color.green())
-    for r in reservations[-10:]:
-        embed.add_field(
-            name=f"📅 {r['day']} | {r['channel']}",
-            value=f"👤 {r['user']}\n🕒 {r['start']}〜{r['end']}",
-            inline=False
+    # add_field を 10 回呼ぶより description を 1 回で組み立てる方が安い
+    embed = discord.Embed(
+        title="☕ 予約一覧（最新10件）",
+        color=discord.Color.green(),
+        description="\n\n".join(
+            f"📅 {r.day} | {r.channel}\n👤 {r.user}\n🕒 {r.start}〜{r.end}"
+            for r in reservations
         )
+    )
     await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 @bot.tree.command(name="reserve_cancel", description="予約をキャンセルします")
 async def reserve_cancel(interaction: discord.Interaction):
-    category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
-    if not category:
-        await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
-        return
-    await interaction.response.send_message(
-        "キャンセルするメニューを選択してください",
-        view=MenuSelectView(category.channels, is_cancel=True),
-        ephemeral=True
-    )
+    await _send_menu(interaction, is_cancel=True, message="キャンセルするメニューを選択してください")
 
 
 @bot.tree.command(name="show_menu", description="予約メニューをチャンネルに表示します")
@@ -342,9 +689,10 @@ async def show_menu(interaction: discord.Interaction):
 async def on_message(message: discord.Message):
     if message.author.bot:
         return
-    if message.content.strip() == "カフェ予約":
-        view = ReservationMenu()
-        await message.channel.send("操作を選んでください！", view=view)
+    # 長いメッセージは長さ比較だけで弾き、strip の文字列生成を踏ませない
+    content = message.content
+    if len(content) < 20 and content.strip() == "カフェ予約":
+        await message.channel.send("操作を選んでください！", view=_RESERVE_VIEW)
         return
     await bot.process_commands(message)
 
@@ -354,6 +702,17 @@ async def on_message(message: discord.Message):
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
 
+    # 初回の対話がサービス構築費を払わないよう、起動時に専用スレッドで温めておく
+    try:
+        await _in_sheets_thread(sheets.get_service)
+    except Exception as e:
+        print(f"⚠️ Sheets service init failed: {e}")
+
+    if not _write_flusher.is_running():
+        _write_flusher.start()
+    if not _cache_warmer.is_running():
+        _cache_warmer.start()
+
     # コマンド同期（ギルド優先）
     try:
         if GUILD_OBJ:
@@ -365,9 +724,9 @@ async def on_ready():
     except Exception as e:
         print(f"⚠️ Sync failed: {e}")
 
-    # View 永続化
+    # View 永続化（on_message と同じ共有インスタンスを登録する）
     try:
-        bot.add_view(ReservationMenu())
+        bot.add_view(_RESERVE_VIEW)
         print("🔁 Persistent ReservationMenu registered")
     except Exception as e:
         print(f"⚠️ Failed to register persistent view: {e}")
@@ -381,16 +740,16 @@ class ReservationMenu(ui.View):
 
     @ui.button(label="📝 予約する", style=discord.ButtonStyle.primary)
     async def reserve_btn(self, interaction: discord.Interaction, button: ui.Button):
-        category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
+        category = get_cafe_category(interaction.guild)
         if not category:
             await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
             return
-        await interaction.response.send_message("メニューを選択してください", view=MenuSelectView(category.channels), ephemeral=True)
+        await interaction.response.send_message("メニューを選択してください", view=MenuSelectView(get_cafe_options(category)), ephemeral=True)
 
     @ui.button(label="❌ キャンセル", style=discord.ButtonStyle.danger)
     async def cancel_btn(self, interaction: discord.Interaction, button: ui.Button):
-        category = interaction.guild.get_channel(CAFE_CATEGORY_ID)
+        category = get_cafe_category(interaction.guild)
         if not category:
             await interaction.response.send_message("❌ カテゴリーが見つかりません。", ephemeral=True)
             return
-        await interaction.response.send_message("キャンセルするメニューを選択", view=MenuSelectView(category.channels, is_cancel=True), ephemeral=True)
+        await interaction.response.send_message("キャンセルするメニューを選択", view=MenuSelectView(get_cafe_options(category), is_cancel=True), ephemeral=True)
@@ -1,22 +1,51 @@
+import asyncio
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
+from time import monotonic
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+try:
+    import orjson  # 任意依存。あれば JSON の往復が数倍速くなる
+except ImportError:
+    orjson = None
+
 import discord
+import httplib2
 from discord.ext import commands, tasks
 from discord import app_commands
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 
 # --- 環境変数読み込み ---
 load_dotenv()
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+# updatedRange（例: "sheet1!A5:I5"）から行番号を取り出す
+_RANGE_ROW_RE = re.compile(r"![A-Z]+(\d+)")
+# 入力正規化用（strptime をフォーマット総当たりで呼ばない）
+_DATE_RE = re.compile(r"^(\d{4})[/-](\d{1,2})[/-](\d{1,2})$")
+_TIME_RE = re.compile(r"^(\d{1,2}):?(\d{2})$")
 JST = timezone(timedelta(hours=9))
 
 
+def json_dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def json_loads(raw: str):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def read_int_env(name: str) -> Optional[int]:
     value = os.getenv(name)
     if value is None:
@@ -46,25 +75,25 @@ def load_google_credentials() -> service_account.Credentials:
 
 
 def normalize_date(text: str) -> str:
-    value = text.strip()
-    for fmt in ("%Y/%m/%d", "%Y-%m-%d"):
-        try:
-            parsed = datetime.strptime(value, fmt)
-            return parsed.strftime("%Y/%m/%d")
-        except ValueError:
-            continue
-    raise ValueError("日付は YYYY/MM/DD 形式で入力してください。")
+    match = _DATE_RE.match(text.strip())
+    if not match:
+        raise ValueError("日付は YYYY/MM/DD 形式で入力してください。")
+    year, month, day = int(match[1]), int(match[2]), int(match[3])
+    try:
+        datetime(year, month, day)  # 実在しない日付はここで弾く
+    except ValueError:
+        raise ValueError("日付は YYYY/MM/DD 形式で入力してください。")
+    return f"{year:04d}/{month:02d}/{day:02d}"
 
 
 def normalize_time(text: str) -> str:
-    value = text.strip()
-    for fmt in ("%H:%M", "%H%M"):
-        try:
-            parsed = datetime.strptime(value, fmt)
-            return parsed.strftime("%H:%M")
-        except ValueError:
-            continue
-    raise ValueError("時間は HH:MM 形式で入力してください。")
+    match = _TIME_RE.match(text.strip())
+    if not match:
+        raise ValueError("時間は HH:MM 形式で入力してください。")
+    hours, minutes = int(match[1]), int(match[2])
+    if hours > 23 or minutes > 59:
+        raise ValueError("時間は HH:MM 形式で入力してください。")
+    return f"{hours:02d}:{minutes:02d}"
 
 
 def time_to_minutes(text: str) -> int:
@@ -72,12 +101,29 @@ def time_to_minutes(text: str) -> int:
     return int(hours) * 60 + int(minutes)
 
 
+def minutes_overlap(start_a: int, end_a: int, start_b: int, end_b: int) -> bool:
+    """分値同士の重なり判定。ホットパスはこちらを使う（文字列パースなし）。"""
+    return max(start_a, start_b) < min(end_a, end_b)
+
+
 def has_overlap(start_a: str, end_a: str, start_b: str, end_b: str) -> bool:
-    sa = time_to_minutes(start_a)
-    ea = time_to_minutes(end_a)
-    sb = time_to_minutes(start_b)
-    eb = time_to_minutes(end_b)
-    return max(sa, sb) < min(ea, eb)
+    """文字列で渡したい呼び出し側向けの薄いラッパー。"""
+    return minutes_overlap(
+        time_to_minutes(start_a),
+        time_to_minutes(end_a),
+        time_to_minutes(start_b),
+        time_to_minutes(end_b),
+    )
+
+
+# httplib2.Http はスレッドセーフではないため、Sheets の同期呼び出しは専用の 1 スレッドに寄せる
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+
+async def run_in_sheets_thread(fn, *args, **kwargs):
+    """Sheets の同期呼び出しを専用スレッドで実行する。"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_SHEETS_EXECUTOR, partial(fn, *args, **kwargs))
 
 
 class SheetClient:
@@ -86,9 +132,6 @@ class SheetClient:
     def __init__(self, spreadsheet_id: str, sheet_name: str, credentials: service_account.Credentials):
         self.spreadsheet_id = spreadsheet_id
         self.sheet_name = sheet_name
-        self.service = build("sheets", "v4", credentials=credentials)
-        self.api = self.service.spreadsheets()
-        self.sheet_id = self._ensure_sheet_exists()
         self.header = [
             "予約者",
             "席名",
@@ -100,55 +143,86 @@ class SheetClient:
             "参加者JSON",
             "reminded",
         ]
-        self._ensure_header_row()
-
-    def _ensure_sheet_exists(self) -> int:
+        # keep-alive な HTTP を 1 本使い回し、呼び出しごとの TLS ハンドシェイクを省く
+        authed_http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=10))
+        self.service = build("sheets", "v4", http=authed_http, cache_discovery=False)
+        self.api = self.service.spreadsheets()
+        self.sheet_id = self._initialize_sheet()
+        # 行キャッシュ（短い TTL）。読み取り系の呼び出しを毎回 API に出さない
+        self._rows_cache: Optional[List[Tuple[int, List[str]]]] = None
+        self._rows_cache_ts = 0.0
+        self._cache_ttl = 5.0
+        # 日付 → [(開始分, 終了分, 行番号, 席名)] と、完全一致キー → 行番号 の索引
+        self._by_day: Dict[str, List[Tuple[int, int, int, str]]] = {}
+        self._row_by_key: Dict[Tuple[str, str, str, str, str], int] = {}
+        # リマインド時刻（分キー）→ (行番号, 行, 送信文面) の索引。毎分の全行走査をなくす
+        self._reminder_index: Dict[str, List[Tuple[int, List[str], str]]] = {}
+        # 「予約確認」用に組み立て済みの Embed。データが変わるまで使い回す
+        self.recent_embed_cache: Optional[discord.Embed] = None
+
+    def _initialize_sheet(self) -> int:
+        """シートの存在・列数・ヘッダー行を get + batchUpdate の 2 往復で整える。"""
         response = self.api.get(spreadsheetId=self.spreadsheet_id).execute()
-        sheets = response.get("sheets", [])
-        for sheet in sheets:
+        sheet_id: Optional[int] = None
+        column_count = 0
+        existing_ids: List[int] = []
+        for sheet in response.get("sheets", []):
             prop = sheet.get("properties", {})
+            existing_ids.append(prop.get("sheetId", 0))
             if prop.get("title") == self.sheet_name:
                 sheet_id = prop.get("sheetId")
                 column_count = prop.get("gridProperties", {}).get("columnCount", 0)
-                if column_count < 9:
-                    self._ensure_min_columns(sheet_id, 9)
-                return sheet_id
-
-        request = {"requests": [{"addSheet": {"properties": {"title": self.sheet_name}}}]}
-        result = self.api.batchUpdate(spreadsheetId=self.spreadsheet_id, body=request).execute()
-        sheet_id = result["replies"][0]["addSheet"]["properties"]["sheetId"]
-        self._ensure_min_columns(sheet_id, 9)
-        return sheet_id
 
-    def _ensure_min_columns(self, sheet_id: int, min_columns: int) -> None:
-        update_body = {
-            "requests": [
+        requests = []
+        if sheet_id is None:
+            # sheetId を自前で採番すれば、addSheet とヘッダー書き込みを同じ batchUpdate に載せられる
+            sheet_id = max(existing_ids, default=0) + 1
+            requests.append(
+                {
+                    "addSheet": {
+                        "properties": {
+                            "sheetId": sheet_id,
+                            "title": self.sheet_name,
+                            "gridProperties": {"columnCount": len(self.header)},
+                        }
+                    }
+                }
+            )
+        elif column_count < len(self.header):
+            requests.append(
                 {
                     "updateSheetProperties": {
                         "properties": {
                             "sheetId": sheet_id,
-                            "gridProperties": {"columnCount": min_columns},
+                            "gridProperties": {"columnCount": len(self.header)},
                         },
                         "fields": "gridProperties.columnCount",
                     }
                 }
-            ]
-        }
-        self.api.batchUpdate(spreadsheetId=self.spreadsheet_id, body=update_body).execute()
+            )
 
-    def _ensure_header_row(self) -> None:
-        range_a1 = f"{self.sheet_name}!A1:I1"
-        result = self.api.values().get(spreadsheetId=self.spreadsheet_id, range=range_a1).execute()
-        values = result.get("values", [])
-        if not values or values[0] != self.header:
-            self.api.values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_a1,
-                valueInputOption="RAW",
-                body={"values": [self.header]},
-            ).execute()
+        # ヘッダーは読み比べずに updateCells で無条件に上書きする（読み 1 回ぶん安い）
+        requests.append(
+            {
+                "updateCells": {
+                    "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+                    "rows": [
+                        {
+                            "values": [
+                                {"userEnteredValue": {"stringValue": name}} for name in self.header
+                            ]
+                        }
+                    ],
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+        self.api.batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
+        return sheet_id
 
     def fetch_rows(self) -> List[Tuple[int, List[str]]]:
+        if self._rows_cache is not None and monotonic() - self._rows_cache_ts < self._cache_ttl:
+            return self._rows_cache
         range_a1 = f"{self.sheet_name}!A:I"
         result = self.api.values().get(spreadsheetId=self.spreadsheet_id, range=range_a1).execute()
         rows = result.get("values", [])
@@ -156,22 +230,74 @@ class SheetClient:
         for idx, row in enumerate(rows, start=1):
             if idx == 1:
                 continue
-            padded = row + [""] * max(0, 9 - len(row))
-            output.append((idx, padded[:9]))
+            # 9 列に欠けがある行だけ埋める（揃っている行はそのまま使い、コピーしない）
+            if len(row) != 9:
+                row = (row + [""] * 9)[:9]
+            output.append((idx, row))
+        self._rows_cache = output
+        self._rows_cache_ts = monotonic()
+        self._rebuild_indexes()
         return output
 
+    def _rebuild_indexes(self) -> None:
+        """行キャッシュから日付別・完全一致・リマインド時刻の各索引を作り直す。"""
+        by_day: Dict[str, List[Tuple[int, int, int, str]]] = {}
+        row_by_key: Dict[Tuple[str, str, str, str, str], int] = {}
+        reminder_index: Dict[str, List[Tuple[int, List[str], str]]] = {}
+        reminder_delta = timedelta(minutes=REMINDER_MINUTES_BEFORE)
+        for row_index, row in self._rows_cache or []:
+            row_by_key[(row[5], row[1], row[2], row[3], row[4])] = row_index
+            day = row[2]
+            start = row[3]
+            if not day or not start:
+                continue
+            if row[4]:
+                try:
+                    start_min = time_to_minutes(start)
+                    end_min = time_to_minutes(row[4])
+                except ValueError:
+                    start_min = end_min = -1
+                if start_min >= 0:
+                    by_day.setdefault(day, []).append((start_min, end_min, row_index, row[1]))
+            if (row[8] or "").strip().lower() != "true":
+                # strptime は毎分のループではなく取り込み時に 1 回だけ払う
+                try:
+                    start_dt = datetime.strptime(f"{day} {start}", "%Y/%m/%d %H:%M").replace(tzinfo=JST)
+                except ValueError:
+                    continue
+                minute_key = (start_dt - reminder_delta).strftime("%Y-%m-%d %H:%M")
+                # メンションと文面も取り込み時に一度だけ組み立てておく
+                mention_ids = set(_parse_user_ids(row[5]))
+                mention_ids.update(_parse_assistant_ids(row[7]))
+                mention_text = " ".join(f"<@{user_id}>" for user_id in mention_ids).strip()
+                reminder_phrase = f"あと{REMINDER_MINUTES_BEFORE}分で" if REMINDER_MINUTES_BEFORE > 0 else "まもなく"
+                message_lines = [
+                    mention_text,
+                    f"{reminder_phrase} {day} {start}〜{row[4] or '未設定'} のカフェ予約（{row[1]}）が始まります。",
+                ]
+                message = "\n".join([line for line in message_lines if line])
+                reminder_index.setdefault(minute_key, []).append((row_index, row, message))
+        self._by_day = by_day
+        self._row_by_key = row_by_key
+        self._reminder_index = reminder_index
+
+    def reservations_due_at(self, minute_key: str) -> List[Tuple[int, List[str], str]]:
+        """指定の分キーにリマインドすべき未通知行を返す。"""
+        self.fetch_rows()  # キャッシュと索引を最新にする
+        return self._reminder_index.get(minute_key, [])
+
+    def _invalidate_rows_cache(self) -> None:
+        self._rows_cache = None
+        self.recent_embed_cache = None
+
     def conflicting_seat_names(self, day: str, start: str, end: str) -> List[str]:
+        self.fetch_rows()  # キャッシュと索引を最新にする
+        sa = time_to_minutes(start)
+        ea = time_to_minutes(end)
         conflicts = []
-        for _, row in self.fetch_rows():
-            row_day = row[2]
-            row_start = row[3]
-            row_end = row[4]
-            if not row_day or not row_start or not row_end:
-                continue
-            if row_day != day:
-                continue
-            if has_overlap(start, end, row_start, row_end):
-                conflicts.append(row[1])
+        for sb, eb, _, seat_name in self._by_day.get(day, ()):
+            if minutes_overlap(sa, ea, sb, eb):
+                conflicts.append(seat_name)
         return conflicts
 
     def append_reservation(
@@ -201,23 +327,27 @@ class SheetClient:
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{self.sheet_name}!A:I",
                 valueInputOption="USER_ENTERED",
+                insertDataOption="INSERT_ROWS",
                 body={"values": [values]},
+                fields="updates.updatedRange",
             )
             .execute()
         )
         updated = response.get("updates", {})
         updated_range = updated.get("updatedRange", "")
-        # updatedRange 例: "sheet1!A5:H5"
-        row_number = 0
-        try:
-            row_part = updated_range.split("!")[1]
-            row_number = int(row_part.split(":")[0][1:])
-        except Exception:
-            pass
+        match = _RANGE_ROW_RE.search(updated_range)
+        row_number = int(match.group(1)) if match else 0
+        if self._rows_cache is not None and row_number:
+            # 追記した行はキャッシュへ直接足す（再取得しない write-through）
+            self._rows_cache.append((row_number, values))
+            self._rebuild_indexes()
+        else:
+            self._invalidate_rows_cache()
+        self.recent_embed_cache = None
         return row_number
 
     def update_assistants(self, row_index: int, assistant_ids: Sequence[int]) -> None:
-        payload = json.dumps([str(user_id) for user_id in assistant_ids], ensure_ascii=False)
+        payload = json_dumps([str(user_id) for user_id in assistant_ids])
         target_range = f"{self.sheet_name}!H{row_index}"
         self.api.values().update(
             spreadsheetId=self.spreadsheet_id,
@@ -225,15 +355,24 @@ class SheetClient:
             valueInputOption="RAW",
             body={"values": [[payload]]},
         ).execute()
+        self._invalidate_rows_cache()
 
     def mark_reminded(self, row_index: int) -> None:
-        target_range = f"{self.sheet_name}!I{row_index}"
-        self.api.values().update(
+        self.mark_many_reminded([row_index])
+
+    def mark_many_reminded(self, row_indices: Iterable[int]) -> None:
+        """複数行の reminded フラグを 1 回の batchUpdate でまとめて立てる。"""
+        data = [
+            {"range": f"{self.sheet_name}!I{row_index}", "values": [["TRUE"]]}
+            for row_index in row_indices
+        ]
+        if not data:
+            return
+        self.api.values().batchUpdate(
             spreadsheetId=self.spreadsheet_id,
-            range=target_range,
-            valueInputOption="RAW",
-            body={"values": [["TRUE"]]},
+            body={"valueInputOption": "RAW", "data": data},
         ).execute()
+        self._invalidate_rows_cache()
 
     def find_matching_row(
         self,
@@ -244,12 +383,8 @@ class SheetClient:
         start: str,
         end: str,
     ) -> Optional[int]:
-        key = (str(user_id), channel_name, day, start, end)
-        for index, row in self.fetch_rows():
-            row_key = (row[5], row[1], row[2], row[3], row[4])
-            if row_key == key:
-                return index
-        return None
+        self.fetch_rows()  # キャッシュと索引を最新にする
+        return self._row_by_key.get((str(user_id), channel_name, day, start, end))
 
     def delete_row(self, row_index: int) -> None:
         body = {
@@ -267,6 +402,7 @@ class SheetClient:
             ]
         }
         self.api.batchUpdate(spreadsheetId=self.spreadsheet_id, body=body).execute()
+        self._invalidate_rows_cache()
 
     def recent_reservations(self, limit: int = 10) -> List[Dict[str, str]]:
         rows = self.fetch_rows()
@@ -289,14 +425,44 @@ class SheetClient:
         return list(reversed(output))
 
 
+# カテゴリ配下の VC 一覧はチャンネル構成イベントが来るまで使い回す
+_category_vc_cache: Dict[int, List[discord.VoiceChannel]] = {}
+_category_vc_names: Dict[int, frozenset] = {}
+
+
 def get_category_voice_channels(guild: Optional[discord.Guild], category_id: int) -> List[discord.VoiceChannel]:
-    """指定カテゴリ配下のボイスチャンネル一覧を返す。"""
+    """指定カテゴリ配下のボイスチャンネル一覧を返す（結果はキャッシュする）。"""
     if not guild:
         return []
+    cached = _category_vc_cache.get(category_id)
+    if cached is not None:
+        return cached
     category = guild.get_channel(category_id)
     if not category or not isinstance(category, discord.CategoryChannel):
         return []
-    return [channel for channel in category.channels if isinstance(channel, discord.VoiceChannel)]
+    channels = [channel for channel in category.channels if isinstance(channel, discord.VoiceChannel)]
+    _category_vc_cache[category_id] = channels
+    _category_vc_names[category_id] = frozenset(channel.name for channel in channels)
+    return channels
+
+
+def get_category_voice_names(guild: Optional[discord.Guild], category_id: int) -> frozenset:
+    """指定カテゴリ配下のボイスチャンネル名集合を返す（結果はキャッシュする）。"""
+    if not guild:
+        return frozenset()
+    names = _category_vc_names.get(category_id)
+    if names is None:
+        get_category_voice_channels(guild, category_id)
+        names = _category_vc_names.get(category_id, frozenset())
+    return names
+
+
+def _invalidate_category_vc_cache(channel: discord.abc.GuildChannel) -> None:
+    """カテゴリ本体・配下チャンネルの変化でキャッシュを捨てる。"""
+    for category_id in (getattr(channel, "category_id", None), channel.id):
+        if category_id is not None:
+            _category_vc_cache.pop(category_id, None)
+            _category_vc_names.pop(category_id, None)
 
 
 class ReservationModal(discord.ui.Modal, title="カフェ予約"):
@@ -329,17 +495,17 @@ class ReservationModal(discord.ui.Modal, title="カフェ予約"):
             await interaction.response.send_message("カフェ用カテゴリが見つかりません。", ephemeral=True)
             return
 
-        seat_channels = [
-            channel for channel in category.channels if isinstance(channel, discord.VoiceChannel)
-        ]
+        seat_channels = get_category_voice_channels(interaction.guild, self.category_id)
         if not seat_channels:
             await interaction.response.send_message("予約対象のVCがカテゴリ内に存在しません。", ephemeral=True)
             return
 
-        conflicts = set(self.sheet.conflicting_seat_names(day, start, end))
+        # Sheets への問い合わせはスレッドに逃がし、その間イベントループを塞がない
+        await interaction.response.defer(ephemeral=True)
+        conflicts = set(await run_in_sheets_thread(self.sheet.conflicting_seat_names, day, start, end))
         available_channels = [ch for ch in seat_channels if ch.name not in conflicts]
         if not available_channels:
-            await interaction.response.send_message("指定した時間帯で空いている席がありません。", ephemeral=True)
+            await interaction.followup.send("指定した時間帯で空いている席がありません。", ephemeral=True)
             return
 
         view = ReservationSeatSelectView(
@@ -350,7 +516,7 @@ class ReservationModal(discord.ui.Modal, title="カフェ予約"):
             end=end,
             user=interaction.user,
         )
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"{day} {start}〜{end} に利用する席を選択してください。",
             view=view,
             ephemeral=True,
@@ -377,12 +543,13 @@ class ReservationSeatSelect(discord.ui.Select):
             return
 
         channel_id = int(self.values[0])
-        channel = discord.utils.get(self.parent_view.channels, id=channel_id)
+        channel = self.parent_view.channel_by_id.get(channel_id)
         if not channel:
             await interaction.response.send_message("選択した席が見つかりません。", ephemeral=True)
             return
 
-        row_index = self.parent_view.sheet.append_reservation(
+        row_index = await run_in_sheets_thread(
+            self.parent_view.sheet.append_reservation,
             user_display=interaction.user.display_name,
             channel_name=channel.name,
             day=self.parent_view.day,
@@ -406,6 +573,8 @@ class ReservationSeatSelectView(discord.ui.View):
         super().__init__(timeout=180)
         self.sheet = sheet
         self.channels = list(channels)
+        # 選択コールバックで線形探索しないための対応表（CancelSeatSelect と同じやり方）
+        self.channel_by_id: Dict[int, discord.VoiceChannel] = {c.id: c for c in self.channels}
         self.day = day
         self.start = start
         self.end = end
@@ -457,7 +626,9 @@ class AssistantSelect(discord.ui.UserSelect):
             return
 
         assistant_ids = [member.id for member in self.values]
-        self.parent_view.sheet.update_assistants(self.parent_view.row_index, assistant_ids)
+        await run_in_sheets_thread(
+            self.parent_view.sheet.update_assistants, self.parent_view.row_index, assistant_ids
+        )
         mentions = ", ".join(member.mention for member in self.values)
         await interaction.response.send_message(f"参加者として {mentions} を登録しました。", ephemeral=True)
 
@@ -524,7 +695,9 @@ class CancelReservationModal(discord.ui.Modal, title="予約キャンセル"):
             await interaction.response.send_message(str(exc), ephemeral=True)
             return
 
-        row_index = self.sheet.find_matching_row(
+        await interaction.response.defer(ephemeral=True)
+        row_index = await run_in_sheets_thread(
+            self.sheet.find_matching_row,
             user_id=interaction.user.id,
             channel_name=self.channel_name,
             day=day,
@@ -532,11 +705,11 @@ class CancelReservationModal(discord.ui.Modal, title="予約キャンセル"):
             end=end,
         )
         if not row_index:
-            await interaction.response.send_message("一致する予約が見つかりません。入力内容をご確認ください。", ephemeral=True)
+            await interaction.followup.send("一致する予約が見つかりません。入力内容をご確認ください。", ephemeral=True)
             return
 
-        self.sheet.delete_row(row_index)
-        await interaction.response.send_message("予約をキャンセルしました。", ephemeral=True)
+        await run_in_sheets_thread(self.sheet.delete_row, row_index)
+        await interaction.followup.send("予約をキャンセルしました。", ephemeral=True)
 
 
 class ReservationPanelView(discord.ui.View):
@@ -556,7 +729,7 @@ class ReservationPanelView(discord.ui.View):
         if not category or not isinstance(category, discord.CategoryChannel):
             await interaction.response.send_message("カフェ用カテゴリが見つかりません。", ephemeral=True)
             return
-        seat_channels = [ch for ch in category.channels if isinstance(ch, discord.VoiceChannel)]
+        seat_channels = get_category_voice_channels(interaction.guild, self.category_id)
         if not seat_channels:
             await interaction.response.send_message("キャンセル対象の席がありません。", ephemeral=True)
             return
@@ -568,9 +741,16 @@ class ReservationPanelView(discord.ui.View):
 
     @discord.ui.button(label="予約確認", style=discord.ButtonStyle.secondary, custom_id="cafebook:confirm_main")
     async def handle_confirm(self, interaction: discord.Interaction, _: discord.ui.Button) -> None:
-        records = self.sheet.recent_reservations(limit=10)
+        # データが変わっていなければ、組み立て済みの Embed を即答する
+        cached = self.sheet.recent_embed_cache
+        if cached is not None:
+            await interaction.response.send_message(embed=cached, ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        records = await run_in_sheets_thread(self.sheet.recent_reservations, 10)
         if not records:
-            await interaction.response.send_message("まだ予約が登録されていません。", ephemeral=True)
+            await interaction.followup.send("まだ予約が登録されていません。", ephemeral=True)
             return
 
         embed = discord.Embed(title="最新の予約リスト", color=discord.Color.blurple())
@@ -578,8 +758,8 @@ class ReservationPanelView(discord.ui.View):
             assistants_display = ""
             raw = record.get("assistants") or "[]"
             try:
-                ids = json.loads(raw)
-            except json.JSONDecodeError:
+                ids = json_loads(raw)
+            except ValueError:
                 ids = []
             mentions = "、".join(f"<@{user_id}>" for user_id in ids) if ids else "なし"
             field_name = f"{record['day']} {record['start']}〜{record['end']} / {record['channel']}"
@@ -589,7 +769,8 @@ class ReservationPanelView(discord.ui.View):
                 f"登録: {record['timestamp']}"
             )
             embed.add_field(name=field_name, value=field_value, inline=False)
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        self.sheet.recent_embed_cache = embed
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 def resolve_ids() -> Tuple[int, Optional[int], Optional[discord.Object], int]:
@@ -629,22 +810,23 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents)
 
 _reminder_channel_cache: Optional[discord.abc.Messageable] = None
+_guild_cache: Optional[discord.Guild] = None
 
 
-async def _get_reminder_channel() -> Optional[discord.abc.Messageable]:
-    global _reminder_channel_cache
-    if REMINDER_CHANNEL_ID <= 0:
-        return None
-    if _reminder_channel_cache:
-        return _reminder_channel_cache
+async def _warm_reminder_targets() -> None:
+    """リマインダー送信先とギルドを起動時に 1 回だけ解決しておく。"""
+    global _reminder_channel_cache, _guild_cache
+    if GUILD_ID_VALUE:
+        _guild_cache = bot.get_guild(GUILD_ID_VALUE)
+    if REMINDER_CHANNEL_ID <= 0 or _reminder_channel_cache is not None:
+        return
     channel = bot.get_channel(REMINDER_CHANNEL_ID)
     if channel is None:
         try:
             channel = await bot.fetch_channel(REMINDER_CHANNEL_ID)
         except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-            return None
+            return
     _reminder_channel_cache = channel
-    return channel
 
 
 def _parse_user_ids(raw_value: str) -> List[int]:
@@ -662,8 +844,8 @@ def _parse_assistant_ids(raw_json: str) -> List[int]:
     if not raw_json:
         return []
     try:
-        parsed = json.loads(raw_json)
-    except json.JSONDecodeError:
+        parsed = json_loads(raw_json)
+    except ValueError:  # json / orjson 双方の JSONDecodeError を吸収する
         return []
     results: List[int] = []
     for item in parsed:
@@ -676,71 +858,61 @@ def _parse_assistant_ids(raw_json: str) -> List[int]:
 
 @tasks.loop(minutes=1)
 async def reminder_loop():
-    if REMINDER_MINUTES_BEFORE <= 0 or REMINDER_CHANNEL_ID <= 0:
-        return
-
-    channel = await _get_reminder_channel()
+    # on_ready で温めたキャッシュを読むだけ（毎分の解決・フェッチをしない）
+    channel = _reminder_channel_cache
     if channel is None:
         return
 
     now_key = datetime.now(JST).replace(second=0, microsecond=0).strftime("%Y-%m-%d %H:%M")
-    reminder_delta = timedelta(minutes=REMINDER_MINUTES_BEFORE)
-    guild = bot.get_guild(GUILD_ID_VALUE) if GUILD_ID_VALUE else None
-    valid_voice_names = {vc.name for vc in get_category_voice_channels(guild, CAFE_CATEGORY_ID)} if guild else set()
-    pending_notifications: List[Tuple[int, List[str]]] = []
-
-    for row_index, row in SHEET_CLIENT.fetch_rows():
-        reminded_flag = (row[8] or "").strip().lower() == "true"
-        if reminded_flag:
-            continue
-        day = (row[2] or "").strip()
-        start = (row[3] or "").strip()
-        if not day or not start:
-            continue
-        try:
-            start_dt = datetime.strptime(f"{day} {start}", "%Y/%m/%d %H:%M").replace(tzinfo=JST)
-        except ValueError:
-            continue
-        reminder_dt = start_dt - reminder_delta
-        if reminder_dt.strftime("%Y-%m-%d %H:%M") != now_key:
-            continue
-        if valid_voice_names and row[1] not in valid_voice_names:
-            continue
-        pending_notifications.append((row_index, row))
-
-    for row_index, row in pending_notifications:
-        mention_ids = set(_parse_user_ids(row[5]))
-        for assistant_id in _parse_assistant_ids(row[7]):
-            mention_ids.add(assistant_id)
-
-        mention_text = " ".join(f"<@{user_id}>" for user_id in mention_ids).strip()
-        reminder_phrase = f"あと{REMINDER_MINUTES_BEFORE}分で" if REMINDER_MINUTES_BEFORE > 0 else "まもなく"
-        message_lines = [
-            mention_text,
-            f"{reminder_phrase} {row[2]} {row[3]}〜{row[4] or '未設定'} のカフェ予約（{row[1]}）が始まります。",
-        ]
-        message = "\n".join([line for line in message_lines if line])
+    guild = _guild_cache
+    valid_voice_names = get_category_voice_names(guild, CAFE_CATEGORY_ID)
+
+    # 分キーの索引を引くだけ。strptime・JSON パース・文面組み立ては取り込み時に済んでいる
+    pending_notifications = [
+        (row_index, message)
+        for row_index, row, message in await run_in_sheets_thread(SHEET_CLIENT.reservations_due_at, now_key)
+        if not valid_voice_names or row[1] in valid_voice_names
+    ]
+
+    notified_rows: List[int] = []
+    for row_index, message in pending_notifications:
         try:
             await channel.send(message)
         except discord.HTTPException:
             continue
-        SHEET_CLIENT.mark_reminded(row_index)
+        notified_rows.append(row_index)
+
+    # 送信に成功した分だけ、1 回の batchUpdate でまとめてフラグを立てる
+    if notified_rows:
+        await run_in_sheets_thread(SHEET_CLIENT.mark_many_reminded, notified_rows)
 
 
 @reminder_loop.before_loop
 async def before_reminder_loop():
     await bot.wait_until_ready()
 
+_synced = False
+
+
 @bot.event
 async def on_ready():
+    global _synced
     try:
-        if GUILD_OBJ:
-            await bot.tree.sync(guild=GUILD_OBJ)
+        # 再接続のたびに sync と View 登録を繰り返さない（sync は重くレート制限もきつい）
+        if not _synced:
+            if GUILD_OBJ:
+                await bot.tree.sync(guild=GUILD_OBJ)
+            else:
+                await bot.tree.sync()
+            bot.add_view(ReservationPanelView(sheet=SHEET_CLIENT, category_id=CAFE_CATEGORY_ID))
+            _synced = True
+        await _warm_reminder_targets()
+        # リマインダーが無効な構成ではタスク自体を起動しない（毎分の空振りをなくす）
+        if REMINDER_MINUTES_BEFORE > 0 and REMINDER_CHANNEL_ID > 0:
+            if not reminder_loop.is_running():
+                reminder_loop.start()
         else:
-            await bot.tree.sync()
-        bot.add_view(ReservationPanelView(sheet=SHEET_CLIENT, category_id=CAFE_CATEGORY_ID))
-        if not reminder_loop.is_running():
-            reminder_loop.start()
+            print("ℹ️ Reminder loop disabled (REMINDER_MINUTES_BEFORE / REMINDER_CHANNEL_ID not set)")
         print(f"✅ cafebook bot ready as {bot.user} (guild scope: {GUILD_ID_VALUE})")
     except Exception as exc:
         print(f"Failed to sync commands: {exc}")
@@ -759,11 +931,32 @@ async def cafebook_panel(interaction: discord.Interaction):
     await interaction.response.send_message("カフェ予約パネルを設置しました。", view=view)
 
 
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    _invalidate_category_vc_cache(channel)
+
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    _invalidate_category_vc_cache(channel)
+
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    _invalidate_category_vc_cache(before)
+    _invalidate_category_vc_cache(after)
+
+
+_PANEL_TRIGGER = "カフェ予約"
+
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author.bot:
         return
-    if message.content.strip() == "カフェ予約":
+    # 長いメッセージは長さ比較だけで弾き、strip の文字列生成を踏ませない
+    content = message.content
+    if len(content) < 20 and content.strip() == _PANEL_TRIGGER:
         view = ReservationPanelView(sheet=SHEET_CLIENT, category_id=CAFE_CATEGORY_ID)
         await message.channel.send("カフェ予約パネルを表示します。", view=view)
         return
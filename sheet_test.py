@@ -1,64 +1,277 @@
+import asyncio
+import logging
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic
+from typing import Final
+
 import discord
+import httplib2
 from discord.ext import commands
 from discord import app_commands
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+log = logging.getLogger(__name__)
 
 # --- 環境変数読み込み ---
 load_dotenv()
-TOKEN = os.getenv("DISCORD_TOKEN")
-SPREADSHEET_ID = os.getenv("GOOGLE_SHEET_ID")
-CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
-GUILD_ID = int(os.getenv("GUILD_ID"))
 
+def _require(name):
+    """必須の環境変数を取得する（未設定なら起動時点で分かりやすく落とす）"""
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"環境変数 {name} が設定されていません")
+    return value
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    token: str
+    spreadsheet_id: str
+    credentials_path: str
+    guild_id: int
+
+SETTINGS = Settings(
+    token=_require("DISCORD_TOKEN"),
+    spreadsheet_id=_require("GOOGLE_SHEET_ID"),
+    credentials_path=_require("GOOGLE_CREDENTIALS_PATH"),
+    guild_id=int(_require("GUILD_ID")),
+)
+
+TOKEN = SETTINGS.token
+SPREADSHEET_ID = SETTINGS.spreadsheet_id
+CREDENTIALS_PATH = SETTINGS.credentials_path
+GUILD_ID = SETTINGS.guild_id
+
+
+# このボットはシートを読むだけなので、スコープも読み取り専用に絞る
+SHEETS_SCOPES: Final[tuple[str, ...]] = (
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+)
+# /sheet_test が表示する範囲（先頭5行 × A〜E列）
+DISPLAY_RANGE: Final[str] = "sheet1!A1:E5"
 
 # --- Discord Bot設定 ---
-intents = discord.Intents.default()
+# スラッシュコマンドしか使わないので、必要最小限のインテントだけ有効にする
+intents = discord.Intents.none()
+intents.guilds = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
 # --- Google Sheets 接続 ---
+@lru_cache(maxsize=1)
 def get_sheets_service():
+    """Sheets APIサービスを取得（初回のみ構築し、以降は同じクライアントを使い回す）"""
     creds = service_account.Credentials.from_service_account_file(
         CREDENTIALS_PATH,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
+        scopes=SHEETS_SCOPES
+    )
+    # keep-alive な HTTP を 1 本使い回して TLS ハンドシェイクを毎回払わない。
+    # httplib2.Http はスレッドセーフではないが、呼び出しは専用スレッド 1 本に
+    # 寄せてあるので共有して問題ない
+    authed_http = AuthorizedHttp(creds, http=httplib2.Http(timeout=5))
+    # static_discovery=True でライブラリ同梱のディスカバリ文書を使い、
+    # 初回構築時のネットワークフェッチを省く
+    service = build(
+        "sheets", "v4",
+        http=authed_http,
+        cache_discovery=False,
+        static_discovery=True,
     )
-    service = build("sheets", "v4", credentials=creds)
     return service.spreadsheets()
 
-# --- テストコマンド ---
-@bot.tree.command(name="sheet_test", description="スプレッドシートの内容を確認します")
-async def sheet_test(interaction: discord.Interaction):
-    await interaction.response.defer(ephemeral=True)
+# --- 読み取り結果のTTLキャッシュ ---
+# cachetools は依存に無いので、(スプレッドシートID, 範囲) キーの辞書と
+# monotonic で十分な簡易TTLキャッシュを持つ
+CACHE_TTL = 30.0  # 秒
 
-    try:
-        sheet = get_sheets_service()
-        result = sheet.values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range="sheet1!A:E"
-        ).execute()
+_values_cache = {}  # (spreadsheet_id, range) -> (取得時刻, values)
+_cache_lock = asyncio.Lock()
+
+# Sheets 呼び出しは専用の 1 スレッドに寄せる（クライアントの共有を安全にし、
+# デフォルトエグゼキュータの他タスクと取り合わない）
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+
+# 一時的なエラーとして再試行してよいステータスコード
+_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def _call_with_retry(fn, attempts=3, base=0.5):
+    """429/5xx を指数バックオフ＋ジッタ付きで再試行する（ワーカースレッド側で使う）"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except HttpError as e:
+            if attempt + 1 >= attempts or e.resp.status not in _RETRYABLE_STATUSES:
+                raise
+            # サーバーが Retry-After を返してきたらそれに従う
+            retry_after = e.resp.get("retry-after")
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    delay = base * (2 ** attempt)
+            else:
+                delay = base * (2 ** attempt)
+            # 同時リトライの衝突を避けるためのジッタ
+            time.sleep(delay + random.uniform(0, base))
+
+def _fetch_values(range_name):
+    """Sheets API を同期呼び出しするワーカー（スレッド側で実行する）"""
+    # 初回のサービス構築（鍵ファイル読み込み＋クライアント生成）もここに含める
+    sheet = get_sheets_service()
+    # 表示に使う範囲だけを取りに行く。UNFORMATTED_VALUE にすると
+    # サーバー側の表示用フォーマット処理も省ける
+    request = sheet.values().batchGet(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=[range_name],
+        majorDimension="ROWS",
+        valueRenderOption="UNFORMATTED_VALUE"
+    )
+    result = _call_with_retry(request.execute)
+    return result["valueRanges"][0]
+
+def cached_values(range_name):
+    """TTL内のキャッシュ値を返す（無ければ None。API は呼ばない）"""
+    cached = _values_cache.get((SPREADSHEET_ID, range_name))
+    if cached is not None and monotonic() - cached[0] < CACHE_TTL:
+        return cached[1]
+    return None
+
+async def read_values(range_name):
+    """指定範囲を読み取る（TTL内はキャッシュを返し、同時要求は1リクエストに相乗り）"""
+    key = (SPREADSHEET_ID, range_name)
+    cached = _values_cache.get(key)
+    if cached is not None and monotonic() - cached[0] < CACHE_TTL:
+        return cached[1]
+
+    # ロックで取得を直列化し、同時に来た呼び出しのスタンピードを防ぐ。
+    # ロック獲得後にもう一度キャッシュを見て、先行者の結果があればそれを使う
+    async with _cache_lock:
+        cached = _values_cache.get(key)
+        if cached is not None and monotonic() - cached[0] < CACHE_TTL:
+            return cached[1]
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                _SHEETS_EXECUTOR, _fetch_values, range_name
+            )
+        except HttpError as e:
+            # 4xx（権限・範囲指定ミスなど）は古い値を返し続けないよう破棄する
+            if 400 <= e.resp.status < 500:
+                _values_cache.pop(key, None)
+            raise
 
         values = result.get("values", [])
-        if not values:
-            await interaction.followup.send("📭 シートは空です。", ephemeral=True)
+        _values_cache[key] = (monotonic(), values)
+        return values
+
+# HttpError のステータスコード → ユーザー向けメッセージ
+_HTTP_ERROR_MESSAGES = {
+    403: "❌ スプレッドシートへのアクセス権がありません。共有設定を確認してください。",
+    404: "❌ スプレッドシートが見つかりません。IDを確認してください。",
+    429: "❌ APIの呼び出し回数制限に達しました。しばらく待ってからお試しください。",
+}
+
+# 応答用 Embed のひな形。毎回 __init__ からフィールドを組み立て直さず、
+# copy() して description だけ差し込む
+_EMBED_TEMPLATE = discord.Embed(
+    title="🧾 スプレッドシートの内容",
+    color=discord.Color.green(),
+)
+
+# --- テストコマンド ---
+@bot.tree.command(name="sheet_test", description="スプレッドシートの内容を確認します")
+@app_commands.checks.cooldown(1, 5.0, key=lambda i: i.user.id)
+async def sheet_test(interaction: discord.Interaction):
+    # キャッシュが生きていれば API 待ちが無いので、defer（「考え中…」表示）を
+    # 挟まずそのまま応答する
+    values = cached_values(DISPLAY_RANGE)
+    if values is not None:
+        send = interaction.response.send_message
+    else:
+        # 2秒以内に取れればそのまま単発応答し、間に合わない場合だけ defer に
+        # 切り替える。shield しておくと wait_for のタイムアウトで取得自体は
+        # キャンセルされず、defer 後にそのまま待ち直せる
+        fetch = asyncio.create_task(read_values(DISPLAY_RANGE))
+        # try は API 呼び出しだけに絞る。送信処理の失敗まで「エラー」として
+        # ユーザーに返すと原因の切り分けがしづらい
+        try:
+            try:
+                values = await asyncio.wait_for(asyncio.shield(fetch), timeout=2.0)
+                send = interaction.response.send_message
+            except asyncio.TimeoutError:
+                await interaction.response.defer(ephemeral=True)
+                send = interaction.followup.send
+                values = await fetch
+        except HttpError as e:
+            log.exception("シートの読み取りに失敗しました")
+            message = _HTTP_ERROR_MESSAGES.get(
+                e.resp.status, f"❌ エラーが発生しました（status={e.resp.status}）。"
+            )
+            if interaction.response.is_done():
+                await interaction.followup.send(message, ephemeral=True)
+            else:
+                await interaction.response.send_message(message, ephemeral=True)
             return
 
-        # 先頭5行だけを表示
-        content = "\n".join([", ".join(row) for row in values[:5]])
-        await interaction.followup.send(f"🧾 スプレッドシートの内容:\n```\n{content}\n```", ephemeral=True)
+    if not values:
+        await send("📭 シートは空です。", ephemeral=True)
+        return
+
+    # UNFORMATTED_VALUE は数値セルを int/float で返すので str に揃える
+    content = "\n".join(", ".join(map(str, row)) for row in values)
+    embed = _EMBED_TEMPLATE.copy()
+    # コードブロック込みで 2000 文字制限に収まるよう切り詰める
+    embed.description = f"```\n{content[:1900]}\n```"
+    await send(embed=embed, ephemeral=True)
 
-    except Exception as e:
-        await interaction.followup.send(f"❌ エラー: {e}", ephemeral=True)
+@sheet_test.error
+async def sheet_test_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.CommandOnCooldown):
+        await interaction.response.send_message(
+            f"⏳ 連続実行はできません。{error.retry_after:.1f}秒後にお試しください。",
+            ephemeral=True
+        )
+        return
+    raise error
 
 # --- 起動 ---
+_synced = False
+
 @bot.event
 async def on_ready():
-    print(f"✅ Logged in as {bot.user}")
+    global _synced
+    log.info("✅ Logged in as %s", bot.user)
+    # on_ready は再接続のたびに呼ばれるので、同期は初回だけにする
+    if _synced:
+        return
     try:
-        synced = await bot.tree.sync()
-        print(f"🔁 Slash commands synced ({len(synced)} commands to guild {GUILD_ID})")
-    except Exception as e:
-        print(f"⚠️ Sync failed: {e}")
+        # ギルド限定で同期する。グローバル同期と違って即時反映され、
+        # 反映待ちの最大1時間を避けられる
+        guild = discord.Object(id=GUILD_ID)
+        bot.tree.copy_global_to(guild=guild)
+        synced = await bot.tree.sync(guild=guild)
+        _synced = True
+        log.info("🔁 Slash commands synced (%d commands to guild %s)", len(synced), GUILD_ID)
+    except Exception:
+        log.exception("⚠️ Sync failed")
+
+async def main():
+    async with bot:
+        await bot.start(TOKEN)
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        # uvloop が入っていればイベントループを差し替える（Linux のみ・任意）
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main())